@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import pygame
+
+
+class AssetManager:
+    """
+    Loads the games sprites the first time one of them is used and packs them all into one atlas surface, with each
+    sprite being a subsurface of it. The sprites without any see through pixels are packed above the ones with them,
+    so that once a display exists the top of the atlas can be converted to the displays pixel format without alpha,
+    which is the quickest to blit, and the bottom with alpha. Until then the sprites are the same as the loaded images.
+    The packed atlas can be saved to a file, so later starts only open that file instead of every image
+    """
+
+    def __init__(self, files, folder='.', cache=None, width=512):
+        """
+        :param files: the file name of each sprite by its name
+        :type files: dict
+        :param folder: the folder the files are in
+        :type folder: str
+        :param cache: the file to save the packed atlas to and load it from, None to always load the separate files.
+        The positions of the sprites are saved next to it with .json added to its name
+        :type cache: str
+        :param width: the width of the atlas in pixels
+        :type width: int
+        """
+        self.files = files
+        self.folder = folder
+        self.cache = cache
+        self.width = width
+        self.__lock = threading.Lock()  # Levels are generated in another thread, which also uses the sprites
+        self.__atlas = None  # The surface all the sprites are packed into
+        self.__rects = None  # Where each sprite is in the atlas
+        self.__opaque_height = 0  # The height of the part of the atlas with the sprites that have no see through pixels
+        self.__sprites = {}  # The subsurface of each sprite
+        self.__converted = False  # Whether the atlas is in the displays pixel format
+        self.files_opened = 0  # The number of files that have been read
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    @property
+    def converted(self):
+        """Whether the sprites are in the displays pixel format"""
+        return self.__converted
+
+    def __signature(self):
+        """
+        Get the size and last change time of every file, so a saved atlas is only used if none of them have changed
+        :return: a dictionary of the file name, size and change time of each sprite
+        """
+        signature = {}
+        for name, file_name in self.files.items():
+            stat = os.stat(os.path.join(self.folder, file_name))
+            signature[name] = [file_name, stat.st_size, stat.st_mtime_ns]
+        return signature
+
+    def __pack(self):
+        """
+        Load every file and pack the images into rows of the atlas, with the images that have no see through pixels
+        in the rows at the top
+        :return: the atlas, the rectangle of each sprite and the height of the rows without see through pixels
+        """
+        images = {}
+        opaque = {}
+        for name, file_name in self.files.items():
+            image = pygame.image.load(os.path.join(self.folder, file_name))
+            self.files_opened += 1
+            images[name] = image
+            opaque[name] = not image.get_flags() & pygame.SRCALPHA \
+                or pygame.surfarray.pixels_alpha(image).min() == 255  # If none of its pixels are see through
+
+        rects = {}
+        x = 0
+        y = 0
+        row_height = 0
+        opaque_height = 0
+        for kind in (True, False):  # The opaque images first
+            for name in sorted((name for name in images if opaque[name] == kind),
+                               key=lambda name: -images[name].get_height()):  # Tallest first so the rows are even
+                width, height = images[name].get_size()
+                if x + width > self.width:  # If it doesn't fit on this row, start the next one
+                    x = 0
+                    y += row_height
+                    row_height = 0
+                rects[name] = pygame.Rect(x, y, width, height)
+                x += width
+                row_height = max(row_height, height)
+            x = 0  # The images with see through pixels start on a new row
+            y += row_height
+            row_height = 0
+            if kind:
+                opaque_height = y
+
+        atlas = pygame.Surface((self.width, max(y, 1)), pygame.SRCALPHA)  # Every pixel starts see through
+        for name, image in images.items():
+            # Adding onto the see through pixels copies the image exactly, alpha and all, rather than blending it
+            atlas.blit(image, rects[name], special_flags=pygame.BLEND_RGBA_ADD)
+        return atlas, rects, opaque_height
+
+    def __load(self):
+        """Load the atlas from the saved one if it is up to date, or pack it from the files and save it"""
+        signature = None
+        if self.cache is not None:
+            signature = self.__signature()
+            try:
+                with open(self.cache + '.json') as layout_file:
+                    layout = json.load(layout_file)
+                self.files_opened += 1
+                if layout['signature'] == signature and layout['width'] == self.width:
+                    self.__atlas = pygame.image.load(self.cache)
+                    self.files_opened += 1
+                    self.__rects = {name: pygame.Rect(rect) for name, rect in layout['rects'].items()}
+                    self.__opaque_height = layout['opaque height']
+                    return
+            except (OSError, ValueError, KeyError, pygame.error):  # If it hasn't been saved or can't be read
+                pass
+
+        self.__atlas, self.__rects, self.__opaque_height = self.__pack()
+        if self.cache is not None:
+            pygame.image.save(self.__atlas, self.cache)
+            with open(self.cache + '.json', 'w') as layout_file:
+                json.dump({'signature': signature, 'width': self.width, 'opaque height': self.__opaque_height,
+                           'rects': {name: list(rect) for name, rect in self.__rects.items()}}, layout_file)
+
+    def convert(self):
+        """
+        Convert the atlas to the displays pixel format if there is a display, so blitting the sprites doesn't have to
+        convert every pixel. Sprites got before this are still the unconverted ones
+        """
+        with self.__lock:
+            if self.__converted or pygame.display.get_surface() is None:
+                return
+            if self.__atlas is None:
+                self.__load()
+            atlas = self.__atlas
+            height = atlas.get_height()
+            if self.__opaque_height > 0:
+                # The opaque sprites are kept in their own surface without alpha and the rest in one with alpha
+                opaque = atlas.subsurface((0, 0, self.width, self.__opaque_height)).convert()
+            else:
+                opaque = None
+            if height > self.__opaque_height:
+                see_through = atlas.subsurface((0, self.__opaque_height, self.width,
+                                                height - self.__opaque_height)).convert_alpha()
+            else:
+                see_through = None
+            sprites = {}
+            for name, rect in self.__rects.items():
+                if rect.top < self.__opaque_height:
+                    sprites[name] = opaque.subsurface(rect)
+                else:
+                    sprites[name] = see_through.subsurface(rect.move(0, -self.__opaque_height))
+            self.__sprites = sprites
+            self.__converted = True
+
+    def get(self, name):
+        """
+        Get a sprite, loading the atlas if it hasn't been loaded and converting it if a display has been made since
+        :param name: the sprites name
+        :type name: str
+        :return: the sprite
+        """
+        if not self.__converted:
+            if pygame.display.get_surface() is not None:
+                self.convert()
+            else:
+                with self.__lock:
+                    if self.__atlas is None:
+                        self.__load()
+                    if name not in self.__sprites and name in self.__rects:
+                        self.__sprites[name] = self.__atlas.subsurface(self.__rects[name])
+        return self.__sprites[name]
+
+
+class TextCache:
+    """
+    Keeps the most recently rendered text surfaces, so text that is drawn again with the same font and colour, e.g. the
+    inventory slot numbers or the game over text, isn't rendered again. Once there are too many the one that was used
+    the longest ago is forgotten
+    """
+
+    def __init__(self, size=256):
+        """
+        :param size: the most text surfaces that are kept
+        :type size: int
+        """
+        self.size = size
+        self.__surfaces = OrderedDict()  # The rendered text by (font, text, colour, antialias), least recently used
+        # first
+        self.hits = 0  # The number of times text was found already rendered
+        self.misses = 0  # The number of times text had to be rendered
+
+    def __len__(self):
+        return len(self.__surfaces)
+
+    def render(self, font, text, antialias, colour):
+        """
+        Get the surface of some text, rendering it if it isn't kept
+        :param font: the font style
+        :type font: font
+        :param text: the text to be rendered
+        :type text: str
+        :param antialias: whether the edges of the text are smoothed
+        :type antialias: bool
+        :param colour: the colour of the text
+        :type colour: tuple
+        :return: the rendered text
+        """
+        key = (font, text, tuple(colour), antialias)
+        surface = self.__surfaces.get(key)
+        if surface is not None:
+            self.__surfaces.move_to_end(key)  # It is now the most recently used
+            self.hits += 1
+            return surface
+        surface = font.render(text, antialias, colour)
+        if pygame.display.get_surface() is not None:  # Convert it once so blitting it doesn't have to
+            surface = surface.convert_alpha()
+        self.__surfaces[key] = surface
+        self.misses += 1
+        if len(self.__surfaces) > self.size:  # Forget the text that was used the longest ago
+            self.__surfaces.popitem(last=False)
+        return surface
@@ -0,0 +1,274 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Stops PyGame from needing a window so this can run headless
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # Keeps PyGame's welcome message out of the results
+import argparse
+import json
+import random
+import tracemalloc
+from time import perf_counter
+import constants
+from bulk import bulk_generate
+from level import level_settings, spawn_level
+from map import MapGenerationError, create_map
+from sort import PathFinder, RoomGraph, merge_sort, select_largest, select_smallest
+
+
+def percentile(times, fraction):
+    """
+    Get a percentile of a sorted list of times
+    :param times: the times, sorted from smallest to largest
+    :type times: list
+    :param fraction: which percentile to get as a fraction, e.g. 0.99 for the 99th percentile
+    :type fraction: float
+    :return: the time
+    """
+    return times[min(len(times) - 1, round(fraction * (len(times) - 1)))]
+
+
+def benchmark_maps(levels, maps):
+    """
+    Time generating the map and spawning everything on it for levels with the same settings the game loop uses
+    :param levels: the levels to generate maps for
+    :type levels: list
+    :param maps: how many maps to generate per level
+    :type maps: int
+    :return: a list of results, one dictionary per level
+    """
+    results = []
+    for level in levels:
+        settings = level_settings(level)
+        times = []
+        rejections = 0
+        failures = 0
+        for _ in range(0, maps):
+            seed = random.getrandbits(32)
+            start_time = perf_counter()
+            try:
+                new_map = spawn_level(settings, seed, 0)[0]
+            except MapGenerationError:  # If the rooms couldn't be placed
+                new_map = None
+            times.append(perf_counter() - start_time)
+            if new_map is None:
+                failures += 1
+            else:
+                rejections += new_map.rejected_rooms
+        # Tracing memory slows everything down, so the peak memory is found by generating one more map afterwards
+        tracemalloc.start()
+        try:
+            spawn_level(settings, random.getrandbits(32), 0)
+        except MapGenerationError:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        times.sort()
+        results.append({'level': level, 'map size': settings['map width'], 'maps': maps,
+                        'maps per sec': len(times) / sum(times), 'p50 ms': percentile(times, 0.5) * 1000,
+                        'p99 ms': percentile(times, 0.99) * 1000, 'mean rejections': rejections / maps,
+                        'failures': failures, 'peak KiB': peak / 1024})
+    return results
+
+
+def benchmark_paths(levels, maps, queries, max_length=None, hierarchical=False):
+    """
+    Time the A* search between random pairs of path tiles on maps the same size as the ones the game generates
+    :param levels: the levels to generate maps for
+    :type levels: list
+    :param maps: how many maps to generate per level
+    :type maps: int
+    :param queries: how many searches to run on each map
+    :type queries: int
+    :param max_length: the most steps a path can take, if None then searches aren't bounded, only used by A*
+    :type max_length: int
+    :param hierarchical: whether to plan paths room by room with a RoomGraph instead of searching every tile
+    :type hierarchical: bool
+    :return: a list of results, one dictionary per level
+    """
+    if hierarchical and max_length is not None:
+        raise ValueError("max_length only bounds A* searches, it can't be used with hierarchical")
+    results = []
+    for level in levels:
+        settings = level_settings(level)
+        map_size = settings['map width']
+        expanded_total = 0
+        found = 0
+        out_of_range = 0
+        steps = 0
+        times = []
+        for _ in range(0, maps):
+            new_map, rooms = create_map(settings['room num'], map_size, map_size, constants.minRoomWidth,
+                                        settings['max room width'], constants.minRoomHeight,
+                                        settings['max room height'])
+            path_finder = PathFinder(map_size, map_size)
+            room_graph = RoomGraph(new_map, rooms)
+            path_tiles = [(x, y) for x in range(0, map_size) for y in range(0, map_size)
+                          if new_map[x][y].block_path is False]  # Every tile that can be walked on
+            for _ in range(0, queries):
+                start_vertex = random.choice(path_tiles)
+                end_vertex = random.choice(path_tiles)
+                start_time = perf_counter()
+                if hierarchical:
+                    path = room_graph.find_path(new_map, start_vertex, end_vertex)
+                    expanded = room_graph.expanded
+                else:
+                    path, expanded = path_finder.a_star(new_map, start_vertex, end_vertex, max_length)
+                    if path_finder.out_of_range:
+                        out_of_range += 1
+                times.append(perf_counter() - start_time)
+                steps += max(len(path) - 1, 0)
+                expanded_total += expanded
+                if len(path) > 0:
+                    found += 1
+        times.sort()
+        results.append({'level': level, 'map size': map_size, 'queries': len(times), 'paths found': found,
+                        'out of range': 'n/a' if hierarchical else out_of_range,  # Room graphs aren't bounded
+                        'mean path length': steps / max(found, 1),
+                        'mean nodes expanded': expanded_total / len(times),
+                        'mean us': sum(times) / len(times) * 1000000,
+                        'max us': times[-1] * 1000000})
+    return results
+
+
+def benchmark_bulk(levels, count, processes, chunk_size):
+    """
+    Time generating lots of levels across a pool of processes, once for each number of processes
+    :param levels: the levels to generate maps for
+    :type levels: list
+    :param count: how many maps to generate per level
+    :type count: int
+    :param processes: the numbers of processes to time it with
+    :type processes: list
+    :param chunk_size: how many levels each process generates at a time
+    :type chunk_size: int
+    :return: a list of results, one dictionary per number of processes
+    """
+    jobs = [(level, random.getrandbits(32)) for level in levels for _ in range(0, count)]
+    results = []
+    for process_count in processes:
+        generated = 0
+        failures = 0
+        packed_bytes = 0
+        start_time = perf_counter()
+        for level, seed, record in bulk_generate(jobs, process_count, chunk_size):
+            if record is None:
+                failures += 1
+            else:
+                generated += 1
+                packed_bytes += len(record.data)
+        seconds = perf_counter() - start_time
+        results.append({'processes': process_count, 'maps': len(jobs), 'failures': failures,
+                        'maps per sec': len(jobs) / seconds, 'seconds': seconds,
+                        'mean KiB per map': packed_bytes / max(generated, 1) / 1024})
+    return results
+
+
+def insertion_merge_sort(numbers):
+    """
+    The merge sort sort.py used to have, which merges by inserting each number of the right half into the left half
+    and so takes O(n^2) time, kept to compare against
+    :param numbers: the numbers to be sorted
+    :type numbers: list
+    :return: the sorted numbers
+    """
+    if len(numbers) <= 1:
+        return numbers
+    num_1 = insertion_merge_sort(numbers[0:len(numbers)//2])
+    num_2 = insertion_merge_sort(numbers[len(numbers)//2:])
+    for num in num_2:
+        count = 0
+        while count < len(num_1) and not num < num_1[count]:
+            count += 1
+        num_1.insert(count, num)
+    return num_1
+
+
+def benchmark_sort(sizes, repeats):
+    """
+    Time sorting lists of random room distances with the old and new merge sorts, the built in sort, and picking the
+    nearest and farthest rooms with the selection helpers
+    :param sizes: the lengths of the lists to sort
+    :type sizes: list
+    :param repeats: how many lists of each size to sort
+    :type repeats: int
+    :return: a list of results, one dictionary per size
+    """
+    results = []
+    for size in sizes:
+        totals = {'insertion merge ms': 0, 'merge ms': 0, 'built in ms': 0, 'select ms': 0}
+        for _ in range(0, repeats):
+            distances = [random.randint(0, size) for _ in range(0, size)]  # Plenty of equal distances
+            start_time = perf_counter()
+            expected = insertion_merge_sort(list(distances))
+            totals['insertion merge ms'] += perf_counter() - start_time
+            start_time = perf_counter()
+            result = merge_sort(distances)
+            totals['merge ms'] += perf_counter() - start_time
+            start_time = perf_counter()
+            sorted(distances)
+            totals['built in ms'] += perf_counter() - start_time
+            start_time = perf_counter()
+            select_smallest(distances, 1)
+            select_largest(distances, 1)
+            totals['select ms'] += perf_counter() - start_time
+            if result != expected:
+                raise AssertionError(f"merge_sort gave a different order for a list of {size}")
+        results.append(dict({'size': size}, **{name: total / repeats * 1000 for name, total in totals.items()}))
+    return results
+
+
+def print_results(results):
+    """
+    Print a list of result dictionaries as a table
+    :param results: the results to be printed
+    :type results: list
+    """
+    headings = list(results[0].keys())
+    print('  '.join(f'{heading:>19}' for heading in headings))
+    for result in results:
+        print('  '.join(f'{value:>19.1f}' if type(value) == float else f'{value:>19}' for value in result.values()))
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)  # Options shared by every benchmark
+    common.add_argument('--seed', type=int, default=0)
+    common.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser = argparse.ArgumentParser(description="Dungeon Crawler benchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    paths = subparsers.add_parser('paths', parents=[common], help="A* search time and nodes expanded per query")
+    paths.add_argument('--levels', type=int, nargs='+', default=[1, 20, 40, 60, 80, 100])
+    paths.add_argument('--maps', type=int, default=5, help="maps generated per level")
+    paths.add_argument('--queries', type=int, default=200, help="searches run per map")
+    paths.add_argument('--max-length', type=int, default=None, help="most steps a path can take")
+    paths.add_argument('--hierarchical', action='store_true', help="plan paths room by room")
+    maps = subparsers.add_parser('maps', parents=[common], help="create_map and spawn_map time per level")
+    maps.add_argument('--levels', type=int, nargs='+', default=list(range(1, 101)))
+    maps.add_argument('--maps', type=int, default=20, help="maps generated per level")
+    bulk = subparsers.add_parser('bulk', parents=[common], help="bulk generation throughput across processes")
+    bulk.add_argument('--levels', type=int, nargs='+', default=[1, 20, 40, 60, 80, 100])
+    bulk.add_argument('--count', type=int, default=200, help="maps generated per level")
+    bulk.add_argument('--processes', type=int, nargs='+', default=[1, os.cpu_count()])
+    bulk.add_argument('--chunk-size', type=int, default=32, help="maps each process generates at a time")
+    sort = subparsers.add_parser('sort', parents=[common], help="merge sort time against the old merge sort")
+    sort.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    sort.add_argument('--repeats', type=int, default=10, help="lists sorted per size")
+    args = parser.parse_args()
+
+    random.seed(args.seed)  # So that every run benchmarks the same maps
+    if args.benchmark == 'paths':
+        if args.hierarchical and args.max_length is not None:
+            paths.error("--max-length only bounds A* searches, it can't be used with --hierarchical")
+        results = benchmark_paths(args.levels, args.maps, args.queries, args.max_length,
+                                   args.hierarchical)
+    elif args.benchmark == 'maps':
+        results = benchmark_maps(args.levels, args.maps)
+    elif args.benchmark == 'bulk':
+        results = benchmark_bulk(args.levels, args.count, args.processes, args.chunk_size)
+    elif args.benchmark == 'sort':
+        results = benchmark_sort(args.sizes, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
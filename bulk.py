@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from level import LevelRecord, level_settings, pack_level, spawn_level
+from map import MapGenerationError
+
+
+_worker_settings = {}  # The settings for each level, worked out once per process
+
+
+def generate_packed(jobs, player_luck=0):
+    """
+    Generate levels with the same code the game uses and pack them, used by each process in the pool
+    :param jobs: the level number and seed of each level to generate
+    :type jobs: list
+    :param player_luck: the players luck stat to spawn the levels with
+    :type player_luck: float
+    :return: a list of the level number, seed and packed level for each job, the packed level is None if the rooms
+    couldn't be placed
+    """
+    packed = []
+    for level, seed in jobs:
+        if level not in _worker_settings:
+            _worker_settings[level] = level_settings(level)
+        settings = _worker_settings[level]
+        try:
+            new_map, player_x, player_y, exit_point, rooms, enemies, chests = spawn_level(settings, seed, player_luck)
+        except MapGenerationError:
+            packed.append((level, seed, None))
+            continue
+        packed.append((level, seed, pack_level(seed, new_map, player_x, player_y, exit_point, rooms, enemies, chests,
+                                               settings['loot items'])))
+    return packed
+
+
+def bulk_generate(jobs, processes=None, chunk_size=32, player_luck=0):
+    """
+    Generate lots of levels across a pool of processes, giving back each one as soon as the chunk it is in is finished
+    (so not in the order they were asked for). Only the packed levels are sent back from the processes, so nothing
+    that needs PyGame has to be copied between them
+    :param jobs: the level number and seed of each level to generate
+    :type jobs: list
+    :param processes: how many processes to use, if None then one per CPU
+    :type processes: int
+    :param chunk_size: how many levels each process generates at a time, bigger chunks mean less time is spent
+    sending jobs and results between processes
+    :type chunk_size: int
+    :param player_luck: the players luck stat to spawn the levels with
+    :type player_luck: float
+    :return: a generator of the level number, seed and LevelRecord for each job, the record is None if the rooms
+    couldn't be placed
+    """
+    jobs = list(jobs)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(generate_packed, jobs[start:start + chunk_size], player_luck)
+                   for start in range(0, len(jobs), chunk_size)]
+        for future in as_completed(futures):
+            for level, seed, data in future.result():
+                if data is None:
+                    yield level, seed, None
+                else:
+                    yield level, seed, LevelRecord(data, level)
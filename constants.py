@@ -1,4 +1,5 @@
 import pygame
+from assets import AssetManager
 
 pygame.init()  # Initialise PyGame
 
@@ -11,6 +12,11 @@ cellHeight = 32  # Height of tiles
 # Map
 minRoomWidth = 4  # Minimum room width - should be greater than 3
 minRoomHeight = 4  # Minimum room height - should be greater than 3
+levelCache = None  # Folder to save generated levels in and load them from, None to always generate them
+worldChunkSize = 32  # The width and height of each chunk of the endless world in tiles
+worldChunkRooms = 4  # The max number of rooms in each chunk of the endless world
+worldMaxRoomSize = 8  # The max width and height of the rooms in the endless world
+worldStoredChunks = 256  # The most unloaded chunks of the endless world that are kept packed in memory
 
 # Colours
 black = (0, 0, 0)
@@ -18,12 +24,61 @@ white = (255, 255, 255)
 blue = (0, 0, 255)
 
 # Sprites and title
+# The sprites are packed into an atlas by the asset manager and only loaded the first time one of them is used, see
+# __getattr__ at the bottom, so constants.playerFront etc. still give the sprite
 title = "Dungeon Crawler"
-icon = pygame.image.load('icon.png')
-floor = pygame.image.load('floor.jpg')
-wall = pygame.image.load('wall.png')
-ladder = pygame.image.load('ladder.png')
-chest = pygame.image.load('chest.png')
+spriteCache = None  # File to save the packed sprites to and load them from, None to always load the separate images
+spriteFiles = {'icon': 'icon.png',
+               'floor': 'floor.jpg',
+               'wall': 'wall.png',
+               'ladder': 'ladder.png',
+               'chest': 'chest.png',
+               # Player sprites
+               'playerDead': 'p dead.png',
+               'playerFront': 'pf.png', 'playerF1': 'pf1.png', 'playerF2': 'pf2.png', 'playerF3': 'pf3.png',
+               'playerF4': 'pf4.png',
+               'playerBack': 'pb.png', 'playerB1': 'pb1.png', 'playerB2': 'pb2.png', 'playerB3': 'pb3.png',
+               'playerB4': 'pb4.png',
+               'playerRight': 'pr.png', 'playerR1': 'pr1.png', 'playerR2': 'pr2.png', 'playerR3': 'pr3.png',
+               'playerR4': 'pr4.png',
+               'playerLeft': 'pl.png', 'playerL1': 'pl1.png', 'playerL2': 'pl2.png', 'playerL3': 'pl3.png',
+               'playerL4': 'pl4.png',
+               # Enemy sprites
+               'enemyDead': 'e dead.png',
+               'enemyLeft': 'el.png', 'enemyL1': 'el1.png', 'enemyL2': 'el2.png', 'enemyL3': 'el3.png',
+               'enemyL4': 'el4.png', 'enemyL5': 'el5.png', 'enemyL6': 'el6.png', 'enemyL7': 'el7.png',
+               'enemyL8': 'el8.png',
+               'enemyRight': 'er.png', 'enemyR1': 'er1.png', 'enemyR2': 'er2.png', 'enemyR3': 'er3.png',
+               'enemyR4': 'er4.png', 'enemyR5': 'er5.png', 'enemyR6': 'er6.png', 'enemyR7': 'er7.png',
+               'enemyR8': 'er8.png',
+               # Weapon and potion sprites
+               'swordT1': 'st1.PNG', 'swordT2': 'st2.PNG', 'swordT3': 'st3.PNG', 'swordT4': 'st4.PNG',
+               'swordT5': 'st5.PNG', 'swordT6': 'st6.PNG',
+               'bluePotion': 'blue potion.PNG', 'greenPotion': 'green potion.PNG', 'redPotion': 'red potion.PNG',
+               # HUD sprites
+               'heart': 'heart.PNG',
+               'heartHalf': 'heart (half).PNG',
+               'inventorySprite': 'inventory slot.PNG'}
+sprites = AssetManager(spriteFiles, cache=spriteCache)
+# Attack animations, a list of the frames ending with the sprite it goes back to
+spriteLists = {'playerFrontAttack': ['playerF1', 'playerF2', 'playerF3', 'playerF4', 'playerFront'],
+               'playerBackAttack': ['playerB1', 'playerB2', 'playerB3', 'playerB4', 'playerBack'],
+               'playerRightAttack': ['playerR1', 'playerR2', 'playerR3', 'playerR4', 'playerRight'],
+               'playerLeftAttack': ['playerL1', 'playerL2', 'playerL3', 'playerL4', 'playerLeft'],
+               'enemyLeftAttack': ['enemyL1', 'enemyL2', 'enemyL3', 'enemyL4', 'enemyL5', 'enemyL6', 'enemyL7',
+                                   'enemyL8', 'enemyLeft'],
+               'enemyRightAttack': ['enemyR1', 'enemyR2', 'enemyR3', 'enemyR4', 'enemyR5', 'enemyR6', 'enemyR7',
+                                    'enemyR8', 'enemyRight']}
+# Weapon and potion names, constants.swordT1 etc. give (sprite, name)
+itemNames = {'swordT1': "sword (T1)",
+             'swordT2': "sword (T2)",
+             'swordT3': "sword (T3)",
+             'swordT4': "sword (T4)",
+             'swordT5': "sword (T5)",
+             'swordT6': "sword (T6)",
+             'bluePotion': "blue potion",
+             'greenPotion': "green potion",
+             'redPotion': "red potion"}
 font1 = pygame.font.Font('freesansbold.ttf', 32)
 font2 = pygame.font.Font('freesansbold.ttf', 80)
 font3 = pygame.font.Font('freesansbold.ttf', 15)
@@ -31,74 +86,13 @@ gameOver = "GAME OVER"  # Text to be displayed when the game is over
 levelFontCoordinates = (0, 0)
 gameOverFontCoordinates = (4, 8)
 inventoryItemFontCoordinates = (9, 17)
-# Player sprites
-playerDead = pygame.image.load('p dead.png')
-playerFront = pygame.image.load('pf.png')
-playerF1 = pygame.image.load('pf1.png')
-playerF2 = pygame.image.load('pf2.png')
-playerF3 = pygame.image.load('pf3.png')
-playerF4 = pygame.image.load('pf4.png')
-playerFrontAttack = [playerF1, playerF2, playerF3, playerF4, playerFront]
-playerBack = pygame.image.load('pb.png')
-playerB1 = pygame.image.load('pb1.png')
-playerB2 = pygame.image.load('pb2.png')
-playerB3 = pygame.image.load('pb3.png')
-playerB4 = pygame.image.load('pb4.png')
-playerBackAttack = [playerB1, playerB2, playerB3, playerB4, playerBack]
-playerRight = pygame.image.load('pr.png')
-playerR1 = pygame.image.load('pr1.png')
-playerR2 = pygame.image.load('pr2.png')
-playerR3 = pygame.image.load('pr3.png')
-playerR4 = pygame.image.load('pr4.png')
-playerRightAttack = [playerR1, playerR2, playerR3, playerR4, playerRight]
-playerLeft = pygame.image.load('pl.png')
-playerL1 = pygame.image.load('pl1.png')
-playerL2 = pygame.image.load('pl2.png')
-playerL3 = pygame.image.load('pl3.png')
-playerL4 = pygame.image.load('pl4.png')
-playerLeftAttack = [playerL1, playerL2, playerL3, playerL4, playerLeft]
-# Enemy sprites
-enemyDead = pygame.image.load('e dead.png')
-enemyLeft = pygame.image.load('el.png')
-enemyL1 = pygame.image.load('el1.png')
-enemyL2 = pygame.image.load('el2.png')
-enemyL3 = pygame.image.load('el3.png')
-enemyL4 = pygame.image.load('el4.png')
-enemyL5 = pygame.image.load('el5.png')
-enemyL6 = pygame.image.load('el6.png')
-enemyL7 = pygame.image.load('el7.png')
-enemyL8 = pygame.image.load('el8.png')
-enemyLeftAttack = [enemyL1, enemyL2, enemyL3, enemyL4, enemyL5, enemyL6, enemyL7, enemyL8, enemyLeft]
-enemyRight = pygame.image.load('er.png')
-enemyR1 = pygame.image.load('er1.png')
-enemyR2 = pygame.image.load('er2.png')
-enemyR3 = pygame.image.load('er3.png')
-enemyR4 = pygame.image.load('er4.png')
-enemyR5 = pygame.image.load('er5.png')
-enemyR6 = pygame.image.load('er6.png')
-enemyR7 = pygame.image.load('er7.png')
-enemyR8 = pygame.image.load('er8.png')
-enemyRightAttack = [enemyR1, enemyR2, enemyR3, enemyR4, enemyR5, enemyR6, enemyR7, enemyR8, enemyRight]
-# Weapon sprites and names (must be in tuple format: (sprite, name))
-swordT1 = (pygame.image.load('st1.png'), "sword (T1)")
-swordT2 = (pygame.image.load('st2.png'), "sword (T2)")
-swordT3 = (pygame.image.load('st3.png'), "sword (T3)")
-swordT4 = (pygame.image.load('st4.png'), "sword (T4)")
-swordT5 = (pygame.image.load('st5.png'), "sword (T5)")
-swordT6 = (pygame.image.load('st6.png'), "sword (T6)")
-bluePotion = (pygame.image.load('blue potion.png'), "blue potion")
-greenPotion = (pygame.image.load('green potion.png'), "green potion")
-redPotion = (pygame.image.load('red potion.png'), "red potion")
-# HUD sprites
-heart = pygame.image.load('heart.png')
-heartHalf = pygame.image.load('heart (half).png')
-inventorySprite = pygame.image.load('inventory slot.png')
 
 
 # Enemies
 attackDistance = 8  # The distance from which an enemy will start moving towards the player
 enemyMoveSpeed = 1000  # How many milliseconds it takes for enemies to move a square
 enemyDeadSpeed = 4000  # How many milliseconds it takes for enemies to de-spawn
+enemyPathRepair = True  # Repair the enemies paths to the player when something moves instead of finding them again
 
 # Player
 playerDeadSpeed = 3000  # How quickly it goes to the game over screen after the player has died
@@ -108,3 +102,25 @@ playerHealthLimit = 20  # The health limit of the player
 # Frame rate and display
 frameRate = 25
 spriteFrames = 2
+dirtyRendering = True  # Only redraw the parts of the screen that have changed, instead of the whole screen every frame
+
+
+def __getattr__(name):
+    """
+    Get a sprite, an animation or a weapon or potion the first time it is used. Once the sprites have been converted to
+    the displays pixel format the result is kept as a normal constant, so this is only called once for each of them
+    :param name: the name of the constant
+    :type name: str
+    :return: the sprite, the list of sprites or the (sprite, name) tuple
+    """
+    if name in itemNames:
+        value = (sprites[name], itemNames[name])
+    elif name in spriteLists:
+        value = [sprites[frame] for frame in spriteLists[name]]
+    elif name in sprites:
+        value = sprites[name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if sprites.converted:
+        globals()[name] = value
+    return value
@@ -0,0 +1,644 @@
+import mmap
+import os
+import random
+import struct
+import zlib
+import numpy as np
+import constants
+from concurrent.futures import ThreadPoolExecutor
+from loot import LootTable, band_weights
+from map import create_map, render_map, spawn_map
+from objs import Grid, Room, Entity, Enemy, Chest, Weapon, DamagePotion, HealthPotion, LuckPotion
+from sort import FlowField
+
+
+def base_settings():
+    """
+    Get the map, enemy and loot settings that the levels start from, before any of the changes for each level
+    :return: a dictionary of settings
+    """
+    # Set map base stats
+    settings = {'room num': 3,  # The max number of rooms that can spawn on a map - original 3
+                'map height': 20,  # The height of the map - original 20
+                'map width': 20,  # The width of the map - original 20
+                'max room width': 4,  # The max possible room width - must be higher than 2 - original 4
+                'max room height': 4}  # The max possible room height - must be higher than 2 - original 4
+
+    # Set enemy base stats
+    settings['enemy chance'] = 2  # Chance enemies spawn out of 10
+    settings['max enemy num'] = 2  # Max number of enemies that can spawn - original 2
+    settings['max enemy health'] = 2  # Max amount of enemy health
+    settings['max enemy damage'] = 1  # Max amount of enemy damage
+
+    # Set loot base stats
+    settings['loot chance'] = 6  # Base loot chance out of 10
+    settings['max loot num'] = 3  # Max amount of loot that can spawn - original 3
+
+    # Create loot templates
+    sprite, name = constants.swordT1
+    sword_t1 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 2}
+    sprite, name = constants.swordT2
+    sword_t2 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 2}
+    sprite, name = constants.swordT3
+    sword_t3 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 3}
+    sprite, name = constants.swordT4
+    sword_t4 = {'sprite': sprite, 'name': name, 'min damage': 2, 'max damage': 4}
+    sprite, name = constants.swordT5
+    sword_t5 = {'sprite': sprite, 'name': name, 'min damage': 2, 'max damage': 5}
+    sprite, name = constants.swordT6
+    sword_t6 = {'sprite': sprite, 'name': name, 'min damage': 3, 'max damage': 5}
+    sprite, name = constants.bluePotion
+    blue_potion = {'sprite': sprite, 'name': name, 'min value': 1, 'max value': 2}
+    sprite, name = constants.redPotion
+    red_potion = {'sprite': sprite, 'name': name, 'min value': 1, 'max value': 2}
+    sprite, name = constants.greenPotion
+    green_potion = {'sprite': sprite, 'name': name, 'min value': 0.1, 'max value': 0.3}
+    settings['loot items'] = {'weapons': [sword_t1, sword_t2, sword_t3, sword_t4, sword_t5, sword_t6],
+                              'blue potions': [blue_potion],
+                              'red potions': [red_potion],
+                              'green potions': [green_potion]}
+    settings['loot table'] = LootTable(settings['loot items'], band_weights(1))  # What loot drops and how often
+    return settings
+
+
+# Settings that go up by a step every few levels, as {setting: (every how many levels, step)}, up to
+# last_growth_level. A setting that is given a new value in level_changes only goes up from the level it was changed at
+level_growth = {'room num': (5, 1),
+                'map width': (5, 3),
+                'map height': (5, 3),
+                'max enemy num': (5, 1),
+                'max room width': (10, 1),
+                'max room height': (10, 1),
+                'max enemy health': (10, 1),
+                'max enemy damage': (10, 1)}
+
+# How much the values of each type of loot go up every 10 levels, as {loot type: (smallest value, largest value, step)}
+loot_growth = {'weapons': ('min damage', 'max damage', 1),
+               'blue potions': ('min value', 'max value', 1),
+               'red potions': ('min value', 'max value', 1),
+               'green potions': ('min value', 'max value', 0.1)}
+
+# Settings that are given a new value at a level, as (level, {setting: value}), in order of level
+level_changes = [(5, {'loot chance': 3, 'max loot num': 1, 'enemy chance': 4, 'max enemy num': 3}),
+                 (10, {'loot chance': 4, 'enemy chance': 5}),
+                 (20, {'max loot num': 2, 'max enemy num': 5, 'loot chance': 5}),
+                 (50, {'enemy chance': 7}),
+                 (65, {'max enemy num': 6}),
+                 (80, {'max loot num': 3, 'loot chance': 6, 'max enemy num': 8, 'enemy chance': 8})]
+
+last_growth_level = 100  # The last level that the settings grow at
+
+
+def level_settings(level):
+    """
+    Work out the map, enemy and loot settings for a level straight from the schedule, which takes the same time for
+    any level rather than going through every level before it
+    :param level: the level number
+    :type level: int
+    :return: a dictionary of settings
+    """
+    settings = base_settings()
+    changed_at = {}  # The level each setting was last given a new value at
+    for change_level, changes in level_changes:
+        if change_level <= level:
+            settings.update(changes)
+            for name in changes:
+                changed_at[name] = change_level
+    grown_to = min(level, last_growth_level)
+    for name, (every, step) in level_growth.items():
+        grown_from = min(changed_at.get(name, 0), last_growth_level)  # A new value replaces the growth before it
+        settings[name] += step * (grown_to // every - grown_from // every)
+    tens = grown_to // 10  # The number of times the loot values have gone up
+    settings['loot items'] = {loot_type: [dict(loot) for loot in loot_list]
+                              for loot_type, loot_list in settings['loot items'].items()}
+    for loot_type, (min_name, max_name, step) in loot_growth.items():
+        for loot in settings['loot items'][loot_type]:
+            loot[min_name] = round(loot[min_name] + step * tens, 6)  # Rounded so 0.1 steps don't leave 0.30000000004
+            loot[max_name] = round(loot[max_name] + step * tens, 6)
+    settings['loot table'] = LootTable(settings['loot items'], band_weights(level))  # Compiled from the new templates
+    return settings
+
+
+def level_seed(game_seed, level):
+    """
+    Get the seed for a level, so that every level of a game can be generated again from the games seed
+    :param game_seed: the seed for the whole game
+    :type game_seed: int
+    :param level: the level number
+    :type level: int
+    :return: the levels seed
+    """
+    return random.Random(f"{game_seed}:{level}").getrandbits(32)
+
+
+def level_streams(seed):
+    """
+    Get separate random number generators for a levels map, spawns and loot values, so that changing how one of
+    them is generated doesn't change the others
+    :param seed: the levels seed
+    :type seed: int
+    :return: the map, spawn and loot random number generators
+    """
+    return random.Random(f"{seed}:map"), random.Random(f"{seed}:spawn"), random.Random(f"{seed}:loot")
+
+
+def luck_bonus(player_luck):
+    """
+    Get the extra loot per room that the players luck gives, which is the only part of the players stats that
+    changes how a level is spawned
+    :param player_luck: the players luck stat
+    :type player_luck: float
+    :return: the number of extra loot that can spawn per room
+    """
+    return len(range(0, int(player_luck)+1, 2))  # One for every 2 of the players luck, the same as in spawn_map
+
+
+class Level:
+    """Holds everything that is generated for a level before it can be played"""
+
+    def __init__(self, seed, player_luck, new_map, rooms, player_x, player_y, exit_point, enemies, chests,
+                 terrain, flow_field):
+        """
+        :param seed: the seed the level was generated from
+        :type seed: int
+        :param player_luck: the players luck stat that the level was spawned with
+        :type player_luck: float
+        :param new_map: the levels map tiles with their properties
+        :type new_map: Grid
+        :param rooms: the levels rooms, sorted by their distance from the origin
+        :type rooms: list
+        :param player_x: the players spawn x coord
+        :type player_x: int
+        :param player_y: the players spawn y coord
+        :type player_y: int
+        :param exit_point: the place where the player can exit the map
+        :type exit_point: Entity
+        :param enemies: the enemies that spawned on the map
+        :type enemies: list
+        :param chests: the chests that spawned on the map
+        :type chests: list
+        :param terrain: the map tiles rendered once, the part of it the camera can see is drawn each frame
+        :type terrain: surface
+        :param flow_field: the distance from each tile to the sides of the players spawn
+        :type flow_field: FlowField
+        """
+        self.seed = seed
+        self.player_luck = player_luck
+        self.new_map = new_map
+        self.rooms = rooms
+        self.player_x = player_x
+        self.player_y = player_y
+        self.exit_point = exit_point
+        self.enemies = enemies
+        self.chests = chests
+        self.terrain = terrain
+        self.flow_field = flow_field
+
+
+def spawn_level(settings, seed, player_luck):
+    """
+    Create a levels map and spawn everything on it, each from its own random number generator, so the same seed,
+    settings and luck always give the same level no matter which thread it is generated in or what else is using
+    random
+    :param settings: the levels settings from level_settings
+    :type settings: dict
+    :param seed: the levels seed
+    :type seed: int
+    :param player_luck: the players luck stat
+    :type player_luck: float
+    :return: the map, the sorted rooms, the players spawn coords, the exit, the enemies and the chests
+    """
+    map_rng, spawn_rng, loot_rng = level_streams(seed)
+    new_map, rooms = create_map(settings['room num'], settings['map height'], settings['map width'],
+                                constants.minRoomWidth, settings['max room width'], constants.minRoomHeight,
+                                settings['max room height'], rng=map_rng)
+    item_font = (constants.inventoryItemFontCoordinates, constants.font1, constants.blue)
+    return spawn_map(new_map, rooms, settings['loot chance'], settings['max loot num'], settings['enemy chance'],
+                     settings['max enemy num'], settings['max enemy health'], settings['max enemy damage'],
+                     constants.ladder, constants.chest, constants.enemyLeft, constants.enemyRight,
+                     constants.enemyLeftAttack, constants.enemyRightAttack, settings['loot table'], item_font,
+                     player_luck, spawn_rng, loot_rng)
+
+
+def generate_level(settings, seed, player_luck, cache=None):
+    """
+    Generate a level, or load it from the cache if it has been generated with the same settings before
+    :param settings: the levels settings from level_settings
+    :type settings: dict
+    :param seed: the levels seed
+    :type seed: int
+    :param player_luck: the players luck stat
+    :type player_luck: float
+    :param cache: where generated levels are saved, if None then levels are always generated
+    :type cache: LevelCache
+    :return: the generated level
+    """
+    spawned = None
+    if cache is not None:
+        spawned = cache.load(settings, seed, player_luck)
+    if spawned is None:  # If it isn't in the cache
+        spawned = spawn_level(settings, seed, player_luck)
+        if cache is not None:
+            cache.save(settings, seed, player_luck, *spawned)
+    new_map, player_x, player_y, exit_point, rooms, enemies, chests = spawned
+    terrain = render_map(new_map, constants.cellWidth, constants.cellHeight, constants.wall, constants.floor)
+    flow_field = FlowField(new_map.width, new_map.height, constants.attackDistance - 2)  # Distances from each tile
+    # to the sides of the player, only searching as far as enemies that are within attack distance
+    flow_field.update(new_map, ((player_x-1, player_y), (player_x+1, player_y)))
+    return Level(seed, player_luck, new_map, rooms, player_x, player_y, exit_point, enemies, chests, terrain,
+                 flow_field)
+
+
+# The level file format, all little endian:
+#   header: magic, version, map width, map height, seed, player x and y, exit x and y, room count, entity count
+#   tiles: 1 byte per tile in the order x * map height + y, bit 0 is a wall, bit 1 is a floor, bit 2 is visible
+#   rooms: x, y, width and height of each room in the order they were sorted in
+#   entities: kind, x, y, then the health, damage and direction of an enemy or the loot type, loot template and
+#   value of a chests item
+_level_magic = b'DCLV'
+_level_version = 4
+_level_header = struct.Struct('<4sBHHIHHHHHH')
+_level_room = struct.Struct('<HHHH')
+_level_entity = struct.Struct('<BHHHHBd')
+_enemy_kind = 1
+_chest_kind = 2
+_loot_types = [('weapons', Weapon), ('blue potions', DamagePotion), ('red potions', HealthPotion),
+               ('green potions', LuckPotion)]
+
+
+def _packed_size(map_width, map_height, room_count, entity_count):
+    """
+    Get the number of bytes a packed level takes up, from the numbers in its header
+    :param map_width: the width of the map
+    :type map_width: int
+    :param map_height: the height of the map
+    :type map_height: int
+    :param room_count: the number of rooms
+    :type room_count: int
+    :param entity_count: the number of enemies and chests
+    :type entity_count: int
+    :return: the number of bytes
+    """
+    return _level_header.size + map_width * map_height + room_count * _level_room.size + \
+        entity_count * _level_entity.size
+
+
+def pack_level(seed, new_map, player_x, player_y, exit_point, rooms, enemies, chests, loot_items):
+    """
+    Pack a newly spawned level into the level file format, before anything on it has moved
+    :param seed: the levels seed
+    :type seed: int
+    :param new_map: the levels map tiles with their properties
+    :type new_map: Grid
+    :param player_x: the players spawn x coord
+    :type player_x: int
+    :param player_y: the players spawn y coord
+    :type player_y: int
+    :param exit_point: the place where the player can exit the map
+    :type exit_point: Entity
+    :param rooms: the levels rooms, sorted by their distance from the origin
+    :type rooms: list
+    :param enemies: the enemies that spawned on the map
+    :type enemies: list
+    :param chests: the chests that spawned on the map
+    :type chests: list
+    :param loot_items: the loot templates the level was spawned with
+    :type loot_items: dict
+    :return: the packed level
+    """
+    tiles = new_map.wall.astype(np.uint8) | new_map.floor.astype(np.uint8) << 1 | new_map.visible.astype(np.uint8) << 2
+    data = [_level_header.pack(_level_magic, _level_version, new_map.width, new_map.height, seed, player_x,
+                               player_y, exit_point.x, exit_point.y, len(rooms), len(enemies) + len(chests)),
+            tiles.tobytes()]
+    for room in rooms:
+        x, y = room.tiles[0][0]  # The top left tile of the room
+        data.append(_level_room.pack(x, y, len(room.tiles), len(room.tiles[0])))
+    for enemy in enemies:
+        facing = 1 if enemy.facing_right else 0
+        data.append(_level_entity.pack(_enemy_kind, enemy.x, enemy.y, enemy.health, enemy.damage, facing, 0))
+    for chest in chests:
+        item = chest.item
+        for loot_type, (name, item_class) in enumerate(_loot_types):
+            if type(item) == item_class:
+                break
+        loot_names = [loot['name'] for loot in loot_items[_loot_types[loot_type][0]]]
+        data.append(_level_entity.pack(_chest_kind, chest.x, chest.y, loot_type, loot_names.index(item.name), 0,
+                                       item.value))
+    return b''.join(data)
+
+
+def save_level(path, data):
+    """
+    Save a level packed by pack_level to a file
+    :param path: the file to save it to
+    :type path: str
+    :param data: the packed level
+    :type data: bytes
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"  # Written separately first so a half written file is never read
+    with open(temporary_path, 'wb') as file:
+        file.write(data)
+    os.replace(temporary_path, path)
+
+
+def load_level(path, loot_items):
+    """
+    Load a level saved by save_level, the file is memory mapped so only the parts that are needed are read
+    :param path: the file to load it from
+    :type path: str
+    :param loot_items: the loot templates the level was spawned with
+    :type loot_items: dict
+    :return: the seed, the map, the players spawn coords, the exit, the rooms, the enemies and the chests, or None if
+    the file isn't a level file
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:  # An empty file can't be memory mapped
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return unpack_level(data, loot_items)
+
+
+def unpack_level(data, loot_items):
+    """
+    Unpack a level packed by pack_level, creating its map and everything that spawned on it
+    :param data: the packed level
+    :type data: bytes
+    :param loot_items: the loot templates the level was spawned with
+    :type loot_items: dict
+    :return: the seed, the map, the players spawn coords, the exit, the rooms, the enemies and the chests, or None if
+    the data isn't a packed level
+    """
+    if len(data) < _level_header.size:
+        return None
+    magic, version, map_width, map_height, seed, player_x, player_y, exit_x, exit_y, room_count, \
+        entity_count = _level_header.unpack_from(data, 0)
+    if magic != _level_magic or version != _level_version:
+        return None
+    if len(data) < _packed_size(map_width, map_height, room_count, entity_count):  # If it has been cut short
+        return None
+    offset = _level_header.size
+    new_map = Grid(map_width, map_height)
+    tiles = np.frombuffer(data, dtype=np.uint8, count=map_width * map_height, offset=offset)
+    tiles = tiles.reshape(map_width, map_height)
+    new_map.wall[:] = tiles & 1 != 0
+    new_map.floor[:] = tiles & 2 != 0
+    new_map.visible[:] = tiles & 4 != 0
+    new_map.connectivity.changed()  # Work out which tiles are connected from the loaded walls when it is needed
+    del tiles  # Memory mapped data can't be closed while an array is still using it
+    offset += map_width * map_height
+
+    rooms = []
+    room_data = data[offset:offset + room_count * _level_room.size]
+    offset += room_count * _level_room.size
+    for x_coord, y_coord, width, height in _level_room.iter_unpack(room_data):
+        room_tiles = [[(x, y) for y in range(y_coord, y_coord + height)]
+                      for x in range(x_coord, x_coord + width)]
+        rooms.append(Room(room_tiles, x_coord + (width // 2), y_coord + (height // 2)))
+
+    exit_point = Entity(exit_x, exit_y, constants.ladder)
+    new_map.occupied[exit_x, exit_y] = True
+    new_map.set_object(exit_x, exit_y, exit_point)
+    enemies = []
+    chests = []
+    font_coords, font, colour = (constants.inventoryItemFontCoordinates, constants.font1, constants.blue)
+    font_x, font_y = font_coords
+    entity_data = data[offset:offset + entity_count * _level_entity.size]
+    for kind, x, y, first, second, third, value in _level_entity.iter_unpack(entity_data):
+        if kind == _enemy_kind:
+            if third == 1:
+                entity = Enemy(x, y, first, second, constants.enemyRight, constants.enemyRightAttack, True)
+            else:
+                entity = Enemy(x, y, first, second, constants.enemyLeft, constants.enemyLeftAttack)
+            enemies.append(entity)
+        else:
+            loot_type, item_class = _loot_types[first]
+            loot = loot_items[loot_type][second]
+            if item_class != LuckPotion:
+                value = int(value)  # Only luck potions have values that aren't whole numbers
+            if item_class == Weapon:
+                item = Weapon(x, y, loot['sprite'], loot['name'], value, loot['min damage'],
+                              loot['max damage'], font_x, font_y, font, colour)
+            else:
+                item = item_class(x, y, loot['sprite'], loot['name'], value, loot['min value'],
+                                  loot['max value'], font_x, font_y, font, colour)
+            entity = Chest(x, y, constants.chest, item)
+            chests.append(entity)
+        new_map.occupied[x, y] = True
+        new_map.set_object(x, y, entity)
+    new_map.index_rooms(rooms)  # Pool the free tiles of each room now that everything is on the map
+    return seed, new_map, player_x, player_y, exit_point, rooms, enemies, chests
+
+
+class LevelRecord:
+    """
+    A level packed by pack_level, read into plain numbers and arrays without creating the map or any PyGame objects,
+    so that lots of levels can be checked or sent between processes cheaply
+    """
+
+    def __init__(self, data, level=None):
+        """
+        :param data: the packed level
+        :type data: bytes
+        :param level: the level number it was generated for
+        :type level: int
+        """
+        self.data = bytes(data)
+        self.level = level
+        if len(self.data) < _level_header.size:
+            raise ValueError("data is too short to be a packed level")
+        magic, version, self.map_width, self.map_height, self.seed, player_x, player_y, exit_x, exit_y, room_count, \
+            entity_count = _level_header.unpack_from(self.data, 0)
+        if magic != _level_magic or version != _level_version:
+            raise ValueError("data isn't a packed level")
+        if len(self.data) < _packed_size(self.map_width, self.map_height, room_count, entity_count):
+            raise ValueError("data is too short for the level in its header")
+        self.player = (player_x, player_y)  # The players spawn coords
+        self.exit = (exit_x, exit_y)
+        offset = _level_header.size
+        self.tiles = np.frombuffer(self.data, dtype=np.uint8, count=self.map_width * self.map_height,
+                                   offset=offset).reshape(self.map_width, self.map_height)  # The tile bits
+        offset += self.map_width * self.map_height
+        self.rooms = list(_level_room.iter_unpack(self.data[offset:offset + room_count * _level_room.size]))
+        # The x, y, width and height of each room
+        offset += room_count * _level_room.size
+        self.enemies = []  # The x, y, health, damage, and direction (1 for right) of each enemy
+        self.chests = []  # The x, y, loot type, loot template number and value of each chests item
+        for kind, x, y, first, second, third, value in \
+                _level_entity.iter_unpack(self.data[offset:offset + entity_count * _level_entity.size]):
+            if kind == _enemy_kind:
+                self.enemies.append((x, y, first, second, third))
+            else:
+                self.chests.append((x, y, _loot_types[first][0], second, value))
+
+    @property
+    def wall(self):
+        """Which tiles are wall tiles"""
+        return self.tiles & 1 != 0
+
+    @property
+    def floor(self):
+        """Which tiles belong to a room"""
+        return self.tiles & 2 != 0
+
+    @property
+    def visible(self):
+        """Which tiles are drawn to the screen"""
+        return self.tiles & 4 != 0
+
+
+class LevelCache:
+    """
+    A folder of saved levels, named by their seed and a checksum of the settings they were generated with, so that
+    levels can be loaded instead of generated again
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: the folder the levels are saved in, it is created if it doesn't exist
+        :type directory: str
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0  # The number of levels that have been loaded
+        self.misses = 0  # The number of levels that weren't saved yet
+
+    def path(self, settings, seed, player_luck):
+        """
+        Get the file a level is saved in
+        :param settings: the levels settings from level_settings
+        :type settings: dict
+        :param seed: the levels seed
+        :type seed: int
+        :param player_luck: the players luck stat
+        :type player_luck: float
+        :return: the files path
+        """
+        values = [(name, value) for name, value in sorted(settings.items()) if name not in ('loot items', 'loot table')]
+        for loot_type, loot_list in sorted(settings['loot items'].items()):  # Every value of the loot templates
+            # apart from their sprites
+            values.append((loot_type, [sorted((name, value) for name, value in loot.items() if name != 'sprite')
+                                       for loot in loot_list]))
+        values.append(('loot weights', settings['loot table'].weights))
+        values.append(('luck bonus', luck_bonus(player_luck)))
+        checksum = zlib.crc32(repr(values).encode())
+        return os.path.join(self.directory, f"{seed:08x}-{checksum:08x}.level")
+
+    def load(self, settings, seed, player_luck):
+        """
+        Load a level if it has been saved
+        :param settings: the levels settings from level_settings
+        :type settings: dict
+        :param seed: the levels seed
+        :type seed: int
+        :param player_luck: the players luck stat
+        :type player_luck: float
+        :return: the map, the players spawn coords, the exit, the rooms, the enemies and the chests in the same order
+        as spawn_level, or None if the level hasn't been saved
+        """
+        path = self.path(settings, seed, player_luck)
+        loaded = None
+        if os.path.exists(path):
+            try:
+                loaded = load_level(path, settings['loot items'])
+            except (OSError, ValueError, IndexError, struct.error):  # A damaged file is the same as a missing one
+                loaded = None
+        if loaded is None or loaded[0] != seed:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loaded[1:]
+
+    def save(self, settings, seed, player_luck, new_map, player_x, player_y, exit_point, rooms, enemies, chests):
+        """
+        Save a newly spawned level
+        :param settings: the levels settings from level_settings
+        :type settings: dict
+        :param seed: the levels seed
+        :type seed: int
+        :param player_luck: the players luck stat
+        :type player_luck: float
+        :param new_map: the levels map tiles with their properties
+        :type new_map: Grid
+        :param player_x: the players spawn x coord
+        :type player_x: int
+        :param player_y: the players spawn y coord
+        :type player_y: int
+        :param exit_point: the place where the player can exit the map
+        :type exit_point: Entity
+        :param rooms: the levels rooms, sorted by their distance from the origin
+        :type rooms: list
+        :param enemies: the enemies that spawned on the map
+        :type enemies: list
+        :param chests: the chests that spawned on the map
+        :type chests: list
+        """
+        save_level(self.path(settings, seed, player_luck),
+                   pack_level(seed, new_map, player_x, player_y, exit_point, rooms, enemies, chests,
+                              settings['loot items']))
+
+
+class LevelBuilder:
+    """
+    Generates the next level in a background thread while the current one is being played, so that it is ready
+    as soon as the player uses the ladder
+    """
+
+    def __init__(self, cache=None):
+        """
+        :param cache: where generated levels are saved, if None then levels are always generated
+        :type cache: LevelCache
+        """
+        self.__cache = cache
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level')
+        self.__future = None  # The level being generated in the background
+        self.__settings = None  # What it is being generated with
+        self.__seed = None
+        self.__luck_bonus = None
+        self.waited = False  # Whether the last level taken had to be waited for or generated there and then
+
+    def start(self, settings, seed, player_luck):
+        """
+        Start generating a level in the background, replacing any level that was already being generated
+        :param settings: the levels settings from level_settings
+        :type settings: dict
+        :param seed: the seed for the levels random number generator
+        :type seed: int
+        :param player_luck: the players luck stat
+        :type player_luck: float
+        """
+        if self.__future is not None:
+            self.__future.cancel()  # Doesn't matter if it has already started, the result just won't be used
+        self.__settings = settings
+        self.__seed = seed
+        self.__luck_bonus = luck_bonus(player_luck)
+        self.__future = self.__executor.submit(generate_level, settings, seed, player_luck, self.__cache)
+
+    def take(self, settings, seed, player_luck):
+        """
+        Get a level, using the one generated in the background if it was generated with the same settings and seed
+        and a luck stat that spawns the same amount of loot, otherwise the level is generated there and then
+        :param settings: the levels settings from level_settings
+        :type settings: dict
+        :param seed: the seed for the levels random number generator
+        :type seed: int
+        :param player_luck: the players luck stat
+        :type player_luck: float
+        :return: the level
+        """
+        future = self.__future
+        self.__future = None
+        if future is not None and not future.cancelled() and settings is self.__settings and seed == self.__seed \
+                and luck_bonus(player_luck) == self.__luck_bonus:  # If the background level is the one asked for
+            self.waited = not future.done()
+            return future.result()  # Waits for it to finish if it hasn't yet, which is still sooner than starting
+        if future is not None:
+            future.cancel()
+        self.waited = True
+        return generate_level(settings, seed, player_luck, self.__cache)
+
+    def shutdown(self):
+        """Stop the background thread once any level it is generating is finished"""
+        if self.__future is not None:
+            self.__future.cancel()
+            self.__future = None
+        self.__executor.shutdown(wait=True)
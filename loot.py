@@ -0,0 +1,191 @@
+import random
+import numpy as np
+from objs import Weapon, DamagePotion, HealthPotion, LuckPotion
+
+
+# How each type of loot is made into an item: the item class, the value the item starts with before a value is
+# generated for it, and the names of the smallest and largest value in its templates
+loot_factories = {'weapons': (Weapon, 1, 'min damage', 'max damage'),
+                  'blue potions': (DamagePotion, 1, 'min value', 'max value'),
+                  'red potions': (HealthPotion, 1, 'min value', 'max value'),
+                  'green potions': (LuckPotion, 0.1, 'min value', 'max value')}
+
+# The weight of each loot template for each band of levels, as (first level of the band, weights), a level uses the
+# last band that starts at or before it. The weights of a loot type are in the same order as its templates, and each
+# template is as likely to drop as its weight out of the total of every weight in the band
+# The first band gives each type of loot a quarter of the drops, split evenly between its templates
+loot_bands = [(1, {'weapons': [1, 1, 1, 1, 1, 1],
+                   'blue potions': [6],
+                   'red potions': [6],
+                   'green potions': [6]})]
+
+
+def band_weights(level):
+    """
+    Get the weights of the loot templates for a level
+    :param level: the level number
+    :type level: int
+    :return: a dictionary of the list of weights for each type of loot
+    """
+    weights = loot_bands[0][1]
+    for first_level, band in loot_bands:
+        if first_level <= level:
+            weights = band
+    return weights
+
+
+class AliasTable:
+    """
+    Picks an index at random with the chance of each index being its weight out of the total weight, using Vose's
+    alias method. Every index gets a column of the same height, and a column whose weight is too small is filled up
+    with part of a column whose weight is too big (its alias), so a pick only needs a random column and a random
+    height in it however many weights there are
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: the weight of each index, which don't have to add up to anything and can be 0
+        :type weights: list
+        """
+        count = len(weights)
+        total = sum(weights)
+        if count == 0 or total <= 0:
+            raise ValueError("an alias table needs at least one weight above 0")
+        scaled = [weight * count / total for weight in weights]  # Each columns weight, the average column is 1
+        probability = [1.0] * count  # The chance of picking each column itself rather than its alias
+        alias = list(range(0, count))  # The index the rest of each column belongs to
+        small = [index for index, weight in enumerate(scaled) if weight < 1]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            probability[less] = scaled[less]
+            alias[less] = more  # The top of the small column is filled with the large one
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # Anything left over is a full column, give or take rounding errors
+        self.__probability = np.array(probability)
+        self.__alias = np.array(alias)
+        self.__count = count
+
+    def __len__(self):
+        return self.__count
+
+    def sample(self, rng=random):
+        """
+        Pick a random index
+        :param rng: where the random numbers come from, e.g. a random.Random with its own seed
+        :type rng: Random
+        :return: the index
+        """
+        column = int(rng.random() * self.__count)
+        if rng.random() < self.__probability[column]:
+            return column
+        return int(self.__alias[column])
+
+    def sample_many(self, count, generator=None):
+        """
+        Pick lots of random indexes at once
+        :param count: how many indexes to pick
+        :type count: int
+        :param generator: where the random numbers come from, if None then a new one is made with a random seed
+        :type generator: numpy.random.Generator
+        :return: an array of the indexes
+        """
+        if generator is None:
+            generator = np.random.default_rng()
+        columns = generator.integers(0, self.__count, count)
+        return np.where(generator.random(count) < self.__probability[columns], columns, self.__alias[columns])
+
+
+class LootTable:
+    """
+    The loot templates of a level compiled into a flat list of entries, one per template, with an alias table to pick
+    between them. The item class and value range of each entry are looked up once here rather than on every drop
+    """
+
+    def __init__(self, loot_items, weights):
+        """
+        :param loot_items: the loot templates of each type of loot
+        :type loot_items: dict
+        :param weights: the weight of each template of each type of loot, e.g. from band_weights
+        :type weights: dict
+        """
+        self.entries = []  # The loot type, template index, template, item class, start value, smallest value and
+        # largest value of each entry
+        self.weights = []  # The weight of each entry
+        for loot_type, loot_list in loot_items.items():
+            item_class, start_value, min_name, max_name = loot_factories[loot_type]
+            for index, loot in enumerate(loot_list):
+                weight = weights[loot_type][index]
+                if weight > 0:
+                    self.entries.append((loot_type, index, loot, item_class, start_value, loot[min_name],
+                                         loot[max_name]))
+                    self.weights.append(weight)
+        self.__alias = AliasTable(self.weights)
+        self.__min_values = np.array([entry[5] for entry in self.entries], dtype=float)
+        self.__max_values = np.array([entry[6] for entry in self.entries], dtype=float)
+        self.__whole = np.array([entry[3] != LuckPotion for entry in self.entries])  # Entries with whole number
+        # values
+
+    def roll(self, rng=random):
+        """
+        Pick a random entry
+        :param rng: where the random numbers come from
+        :type rng: Random
+        :return: the entries index
+        """
+        return self.__alias.sample(rng)
+
+    def create(self, x, y, font_x, font_y, font, colour, rng=random, value_rng=None):
+        """
+        Pick a random entry and make an item from it with a newly generated value
+        :param x: the items x coord
+        :type x: int
+        :param y: the items y coord
+        :type y: int
+        :param font_x: the x coord of the items value text
+        :type font_x: int
+        :param font_y: the y coord of the items value text
+        :type font_y: int
+        :param font: the font of the items value text
+        :type font: Font
+        :param colour: the colour of the items value text
+        :type colour: tuple
+        :param rng: where the random numbers for picking the entry come from
+        :type rng: Random
+        :param value_rng: where the random numbers for the items value come from, if None then rng is used
+        :type value_rng: Random
+        :return: the item
+        """
+        if value_rng is None:
+            value_rng = rng
+        _, _, loot, item_class, start_value, min_value, max_value = self.entries[self.roll(rng)]
+        item = item_class(x, y, loot['sprite'], loot['name'], start_value, min_value, max_value, font_x, font_y,
+                          font, colour)
+        item.generate_value(value_rng)
+        return item
+
+    def sample(self, count, generator=None):
+        """
+        Pick lots of random entries and values at once without making any items, e.g. for simulating thousands of
+        drops
+        :param count: how many drops to pick
+        :type count: int
+        :param generator: where the random numbers come from, if None then a new one is made with a random seed
+        :type generator: numpy.random.Generator
+        :return: an array of the index of each drops entry and an array of each drops value
+        """
+        if generator is None:
+            generator = np.random.default_rng()
+        indexes = self.__alias.sample_many(count, generator)
+        min_values = self.__min_values[indexes]
+        max_values = self.__max_values[indexes]
+        whole = self.__whole[indexes]
+        values = generator.uniform(min_values, max_values)  # Luck potions have any value in their range
+        values[whole] = generator.integers(min_values[whole].astype(np.int64), max_values[whole].astype(np.int64),
+                                           endpoint=True)  # The rest are whole numbers, the same as randint
+        return indexes, values
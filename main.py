@@ -1,54 +1,36 @@
+import argparse
 import pygame
+import random
 import constants
-from map import create_map, draw_map, spawn_map
+from level import LevelBuilder, LevelCache, level_seed, level_settings
 from objs import Player, Camera, Font, Chest, Enemy, Weapon, LuckPotion, HealthPotion, DamagePotion
+from render import DirtyRenderer
+from world import ChunkedWorld
 
 
-def game_draw(screen, map_surface, current_map, sprites, camera, exit_point, map_width, map_height, player, level_font):
+def game_draw(screen, renderer, terrain, current_map, camera, player, level_font):
     """
     Function that draws everything to the screen, e.g. the background
     :param screen: the screen to be drawn to
     :type screen: surface
-    :param map_surface: the place where everything on the map is drawn
-    :type map_surface: surface
-    :param current_map: the list of tiles with their properties
-    :type current_map: list
-    :param sprites: a list of sprites to draw
-    :type sprites: list
+    :param renderer: draws the frame, only updating the parts of the screen that have changed
+    :type renderer: DirtyRenderer
+    :param terrain: the map tiles rendered once for the level
+    :type terrain: surface
+    :param current_map: the list of tiles with their properties, used to find the sprites that can be seen
+    :type current_map: Grid
     :param camera: the players view of the map
     :type camera: Camera
-    :param exit_point: the place where the player can exit the map
-    :type exit_point: Entity
-    :param map_width: the width of the map
-    :type map_width: int
-    :param map_height: the height of the map
-    :type map_height: int
     :param player: the player character
     :type player: Player
     :param level_font: the font to be drawn to the screen that displays the current level
     :type level_font: Font
     """
-    screen.fill(constants.black)  # Fill the background with the colour black
-
     camera.update(player.x, player.y, constants.cellWidth, constants.cellHeight)  # Update the camera
 
-    draw_map(current_map, map_surface, map_width, map_height, constants.cellWidth,
-             constants.cellHeight, constants.wall, constants.floor)  # Draw the map to the screen
-
-    exit_point.draw(map_surface, constants.cellWidth, constants.cellHeight)  # Draw the exit to the screen
-    for group in sprites:
-        for sprite in group:  # For each sprite
-            sprite.draw(map_surface, constants.cellWidth, constants.cellHeight)  # Draw all sprites to the screen
-
-    player.draw(map_surface, constants.cellWidth, constants.cellHeight)  # Draw the player to the screen
-
-    screen.blit(map_surface, (0, 0), camera.rectangle)  # Third argument is the optional width and height of the display
-
-    # HUD
-    level_font.draw(screen, constants.cellWidth, constants.cellHeight)  # Draw the font to the screen
-    player.draw_display(screen, constants.cellWidth, constants.cellHeight)  # Draw the players inventory to the screen
-
-    pygame.display.flip()  # Update the screen
+    # The whole screen is only drawn again when the camera has moved, otherwise just the places where a sprite has
+    # moved or changed frame and the HUD if it has changed are drawn and sent to the display
+    renderer.draw(screen, terrain, current_map, camera, player, level_font)
 
 
 def game_initialise():
@@ -61,21 +43,20 @@ def game_initialise():
     pygame.display.set_icon(constants.icon)  # Set the windows icon
 
 
-def game_loop():
-    """Main game loop that updates the screen"""
+def game_loop(start_level=1):
+    """
+    Main game loop that updates the screen
+    :param start_level: the level the game starts at
+    :type start_level: int
+    """
 
     # Clock
     clock = pygame.time.Clock()
     enemy_move_timer = 0
     enemy_moved = False
 
-    # Set map base stats
-    level = 1  # The players current level
-    room_num = 3  # The max number of rooms that can spawn on a map - original 3
-    map_height = 20  # The height of the map - original 20
-    map_width = 20  # The width of the map - original 20
-    max_room_width = 4  # The max possible room width - must be higher than 2 - original 4
-    max_room_height = 4  # The max possible room height - must be higher than 2 - original 4
+    # Set the starting level, the map, enemy and loot stats for each level come from level_settings
+    level = start_level  # The players current level
     x, y = constants.levelFontCoordinates
     level_font = Font(x, y, constants.font1, constants.white, "Level " + str(level))  # Level font
 
@@ -83,48 +64,25 @@ def game_loop():
     player_health = 5  # Players health number
     player_damage = 1  # Players damage number
 
-    # Set enemy base stats
-    enemy_chance = 2  # Chance enemies spawn out of 10
-    max_enemy_num = 2  # Max number of enemies that can spawn - original 2
-    max_enemy_health = 2  # Max amount of enemy health
-    max_enemy_damage = 1  # Max amount of enemy damage
-
-    # Set loot base stats
-    loot_chance = 6  # Base loot chance out of 10
-    max_loot_num = 3  # Max amount of loot that can spawn - original 3
-
     # Create the screen and camera
     screen = pygame.display.set_mode((constants.gameWidth, constants.gameHeight))  # Game window size
     camera = Camera(constants.gameWidth, constants.gameHeight)
+    renderer = DirtyRenderer(constants.cellWidth, constants.cellHeight, constants.black, constants.dirtyRendering)
 
     # Create player
     player = Player(0, 0, player_health, player_damage, constants.playerFront, constants.playerFrontAttack,
                     constants.playerInventorySize, constants.inventorySprite, constants.heart, constants.font3,
                     constants.black, constants.playerHealthLimit)
 
-    # Create loot templates
-    sprite, name = constants.swordT1
-    sword_t1 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 2}
-    sprite, name = constants.swordT2
-    sword_t2 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 2}
-    sprite, name = constants.swordT3
-    sword_t3 = {'sprite': sprite, 'name': name, 'min damage': 1, 'max damage': 3}
-    sprite, name = constants.swordT4
-    sword_t4 = {'sprite': sprite, 'name': name, 'min damage': 2, 'max damage': 4}
-    sprite, name = constants.swordT5
-    sword_t5 = {'sprite': sprite, 'name': name, 'min damage': 2, 'max damage': 5}
-    sprite, name = constants.swordT6
-    sword_t6 = {'sprite': sprite, 'name': name, 'min damage': 3, 'max damage': 5}
-    sprite, name = constants.bluePotion
-    blue_potion = {'sprite': sprite, 'name': name, 'min value': 1, 'max value': 2}
-    sprite, name = constants.redPotion
-    red_potion = {'sprite': sprite, 'name': name, 'min value': 1, 'max value': 2}
-    sprite, name = constants.greenPotion
-    green_potion = {'sprite': sprite, 'name': name, 'min value': 0.1, 'max value': 0.3}
-    loot_items = {'weapons': [sword_t1, sword_t2, sword_t3, sword_t4, sword_t5, sword_t6],
-                  'blue potions': [blue_potion],
-                  'red potions': [red_potion],
-                  'green potions': [green_potion]}
+    # Levels are generated in the background while the level before is played, each from its own seed so that
+    # they come out the same as if they were generated when the player used the ladder
+    level_cache = None
+    if constants.levelCache is not None:  # If generated levels should be saved and loaded again
+        level_cache = LevelCache(constants.levelCache)
+    level_builder = LevelBuilder(level_cache)
+    game_seed = random.getrandbits(32)  # Every levels seed comes from this, so a game can be generated again
+    settings = level_settings(level)  # The map, enemy and loot settings for the first level
+    seed = level_seed(game_seed, level)
 
     # Game loop
     running = True
@@ -134,82 +92,29 @@ def game_loop():
         while in_game:  # While in the game
             completed = False
 
-            # Update the map specifications
-            if level % 5 == 0 and level < 101:  # Every 5 levels up to level 100
-                # Increase these map / enemy stats
-                room_num += 1
-                map_width += 3
-                map_height += 3
-                max_enemy_num += 1
-            if level % 10 == 0 and level < 101:  # Every 10 levels up to level 100
-                # Increase these map / enemy stats
-                for weapon in loot_items['weapons']:
-                    weapon['min damage'] += 1
-                    weapon['max damage'] += 1
-                for potion in loot_items['blue potions']:
-                    potion['min value'] += 1
-                    potion['max value'] += 1
-                for potion in loot_items['red potions']:
-                    potion['min value'] += 1
-                    potion['max value'] += 1
-                for potion in loot_items['green potions']:
-                    potion['min value'] += 0.1
-                    potion['max value'] += 0.1
-                max_room_width += 1
-                max_room_height += 1
-                max_enemy_health += 1
-                max_enemy_damage += 1
-            if level == 5:  # At level 5
-                # Increase these enemy and chest chances / numbers
-                loot_chance = 3
-                max_loot_num = 1
-                enemy_chance = 4
-                max_enemy_num = 3
-            elif level == 10:  # At level 10
-                # Increase these enemy and chest chances / numbers
-                loot_chance = 4
-                enemy_chance = 5
-            elif level == 20:  # At level 20
-                # Increase these enemy and chest chances / numbers
-                max_loot_num = 2
-                max_enemy_num = 5
-                loot_chance = 5
-            elif level == 50:  # At level 50
-                # Increase the enemy chance
-                enemy_chance = 7
-            elif level == 65:  # At level 65
-                # Increase the enemy number
-                max_enemy_num = 6
-            elif level == 80:  # At level 80
-                # Increase these enemy and chest chances / numbers
-                max_loot_num = 3
-                loot_chance = 6
-                max_enemy_num = 8
-                enemy_chance = 8
-
-            # Generate a new map and spawn things on it and a new map surface
-            map_surface = pygame.Surface((map_width * constants.cellWidth, map_height * constants.cellHeight))
-            new_map, rooms = create_map(room_num, map_height, map_width, constants.minRoomWidth, max_room_width,
-                                        constants.minRoomHeight, max_room_height)
-            item_font = (constants.inventoryItemFontCoordinates, constants.font1, constants.blue)
-            new_map, player.x, player.y, exit_point, rooms, enemies, chests = spawn_map(new_map, rooms, loot_chance,
-                                                                                        max_loot_num, enemy_chance,
-                                                                                        max_enemy_num,
-                                                                                        max_enemy_health,
-                                                                                        max_enemy_damage,
-                                                                                        constants.ladder,
-                                                                                        constants.chest,
-                                                                                        constants.enemyLeft,
-                                                                                        constants.enemyRight,
-                                                                                        constants.enemyLeftAttack,
-                                                                                        constants.enemyRightAttack,
-                                                                                        loot_items, item_font,
-                                                                                        player.luck)
+            # Get the level, which will usually have already been generated in the background
+            current_level = level_builder.take(settings, seed, player.luck)
+            new_map = current_level.new_map
+            terrain = current_level.terrain
+            player.x = current_level.player_x
+            player.y = current_level.player_y
+            exit_point = current_level.exit_point
+            enemies = current_level.enemies
+            chests = current_level.chests
+            flow_field = current_level.flow_field  # Distances from each tile to the sides of the player
+
+            # Start generating the next level with the map specifications for it
+            settings = level_settings(level + 1)
+            seed = level_seed(game_seed, level + 1)
+            level_builder.start(settings, seed, player.luck)
+
+            changed_tiles = []  # Tiles that have become occupied or free since the flow field was last updated
             items = []  # Create a blank list of items - only includes ones to be drawn to the screen
             level_font.set_text("Level " + str(level))  # Reset the level text
             player.set_direction()  # Reset the players direction
 
             while not completed and in_game:  # While the current level has not been completed
+                player_tile = (player.x, player.y)  # Where the player was at the start of the frame
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:  # If the user presses the button to close the window
                         running = False  # Stop the game loop
@@ -250,6 +155,7 @@ def game_loop():
                             if event.key == pygame.K_r:  # If the 'r' key is pressed
                                 new_map, items = player.remove_item(new_map, items)  # Drop the players current item
                                 # from their inventory
+                                changed_tiles.append(player.direction)  # The item may now be on the floor there
                             if event.key == pygame.K_f:  # If the 'f' key is pressed
                                 player.perform_potion_interaction()  # Attempt to perform an interaction with a potion
                                 player.change_heart_display()  # Update the number of hearts being displayed
@@ -277,6 +183,7 @@ def game_loop():
                                     if player.pick_up_item(tile_object):  # If the item can be and has been picked up
                                         items, new_map = tile_object.remove_sprite(items, new_map, x, y)
                                         # Remove that item from the list of items
+                                        changed_tiles.append((x, y))  # The tile can now be walked through
                                         player.perform_weapon_interaction()  # Attempt to perform an interaction
                                         # with a weapon
                                 else:  # Else
@@ -286,19 +193,33 @@ def game_loop():
                     player.perform_attack_animation(constants.spriteFrames)
 
                 # Allow Enemies to attack the player
-                player_left = (player.x-1, player.y)  # Tile to players left
-                player_right = (player.x+1, player.y)  # Tile to players right
+                if (player.x, player.y) != player_tile:  # If the player has moved
+                    changed_tiles.append(player_tile)  # Both the tile they left and the one they are on have changed
+                    changed_tiles.append((player.x, player.y))
+                if player.moved_again or len(changed_tiles) > 0:  # If the player or anything else has moved
+                    player_left = (player.x-1, player.y)  # Tile to players left
+                    player_right = (player.x+1, player.y)  # Tile to players right
+                    # Find every tiles distance to the player once, rather than every enemy searching for its own path
+                    if constants.enemyPathRepair:  # Only change the distances affected by what has moved
+                        flow_field.repair(new_map, (player_left, player_right), changed_tiles)
+                    else:  # Find every distance again
+                        flow_field.update(new_map, (player_left, player_right))
+                    changed_tiles = []
                 for enemy in enemies:  # For each enemy
                     if not enemy.dead:  # If they are not dead
-                        if enemy.check_distance(constants.attackDistance, player_left, player_right, new_map,
-                                                player.moved_again)\
+                        if enemy.check_distance(constants.attackDistance, flow_field)\
                                 and enemy_move_timer >= constants.enemyMoveSpeed and enemy.moving:
                             # If they are within distance to attack the player and it is time for them to move again
                             # and they can move
-                            new_map = enemy.take_object_path(new_map, constants.enemyLeft, constants.enemyLeftAttack,
-                                                             constants.enemyRight, constants.enemyRightAttack)
+                            enemy_tile = (enemy.x, enemy.y)
+                            new_map = enemy.take_object_path(new_map, flow_field, constants.enemyLeft,
+                                                             constants.enemyLeftAttack, constants.enemyRight,
+                                                             constants.enemyRightAttack)
                             # Take a path to the player
                             enemy_moved = True  # An enemy has moved
+                            if (enemy.x, enemy.y) != enemy_tile:  # The tiles the enemy moved between have changed
+                                changed_tiles.append(enemy_tile)
+                                changed_tiles.append((enemy.x, enemy.y))
                         elif not enemy.moving:  # If the enemy is not moving they are attacking
                             enemy.perform_attack_animation(constants.spriteFrames)  # Let them perform
                             # their attack animation
@@ -311,6 +232,7 @@ def game_loop():
                     elif enemy.dead and enemy.check_dead_timer(clock.get_time(), constants.enemyDeadSpeed):
                         # If the enemy is dead and they have been dead for a specified amount of time
                         enemies, new_map = enemy.remove_sprite(enemies, new_map)  # Remove them from the list of enemies
+                        changed_tiles.append((enemy.x, enemy.y))  # The tile they were on can now be walked through
 
                 # Frame rate
                 clock.tick(constants.frameRate)
@@ -320,9 +242,7 @@ def game_loop():
                 enemy_move_timer += clock.get_time()  # Add additional time to the enemy move timer
 
                 # Update the screen
-                sprites = [enemies, chests, items]  # List of lists of sprites to be drawn
-                game_draw(screen, map_surface, new_map, sprites, camera, exit_point, map_width, map_height, player,
-                          level_font)
+                game_draw(screen, renderer, terrain, new_map, camera, player, level_font)
 
                 # Update the players
                 if player.moved_again:  # If the player has moved again
@@ -344,7 +264,73 @@ def game_loop():
                     game_over = False  # Stop the in game loop
             pygame.display.flip()  # Update the screen
 
+    level_builder.shutdown()  # Stop generating levels in the background
+
+
+def world_loop():
+    """
+    Game loop for the endless world mode, where the player explores a dungeon that is generated in chunks around them
+    as they move, so the size of the dungeon isn't limited by memory
+    """
+
+    # Clock
+    clock = pygame.time.Clock()
+
+    # Create the screen, camera and world
+    screen = pygame.display.set_mode((constants.gameWidth, constants.gameHeight))  # Game window size
+    camera = Camera(constants.gameWidth, constants.gameHeight)
+    world = ChunkedWorld(random.getrandbits(32), constants.worldChunkSize, constants.worldChunkRooms,
+                         constants.worldMaxRoomSize, constants.minRoomWidth, constants.worldStoredChunks)
+
+    # Create player
+    x, y = world.spawn_point
+    player = Player(x, y, 5, 1, constants.playerFront, constants.playerFrontAttack, constants.playerInventorySize,
+                    constants.inventorySprite, constants.heart, constants.font3, constants.black,
+                    constants.playerHealthLimit)
+    world[x][y].occupied = True
+    world[x][y].object = player
+
+    running = True
+    while running:  # While the game is still running
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:  # If the user presses the button to close the window
+                running = False  # Stop the game loop
+            if event.type == pygame.KEYDOWN:  # If the user presses a key down
+                if event.key == pygame.K_a:  # If the key is 'a'
+                    world = player.move(world, -1, 0, constants.playerLeft, constants.playerLeftAttack)
+                if event.key == pygame.K_d:  # If the key is 'd'
+                    world = player.move(world, 1, 0, constants.playerRight, constants.playerRightAttack)
+                if event.key == pygame.K_w:  # If the key is 'w'
+                    world = player.move(world, 0, -1, constants.playerBack, constants.playerBackAttack)
+                if event.key == pygame.K_s:  # If the key is 's'
+                    world = player.move(world, 0, 1, constants.playerFront, constants.playerFrontAttack)
+        player.moved_again = False
+
+        # Load the chunks around the camera and unload the ones far away from it
+        camera.update(player.x, player.y, constants.cellWidth, constants.cellHeight)
+        view = camera.rectangle
+        world.update(view, constants.cellWidth, constants.cellHeight)
+
+        # Update the screen, everything is drawn straight to it as there is no map surface for the whole world
+        screen.fill(constants.black)  # Fill the background with the colour black
+        world.draw(screen, view, constants.cellWidth, constants.cellHeight, constants.wall, constants.floor)
+        player.draw(screen, constants.cellWidth, constants.cellHeight, -view.left, -view.top)  # Draw the player
+        player.draw_display(screen, constants.cellWidth, constants.cellHeight)  # Draw the players inventory
+        pygame.display.flip()  # Update the screen
+
+        # Frame rate
+        clock.tick(constants.frameRate)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=constants.title)
+    parser.add_argument('--world', action='store_true', help="explore an endless dungeon that is generated in chunks")
+    parser.add_argument('--level', type=int, default=1, help="the level to start the game at")
+    args = parser.parse_args()
+    if args.level < 1:  # The levels settings only work from level 1 upwards
+        parser.error("--level must be 1 or more")
     game_initialise()
-    game_loop()
+    if args.world:
+        world_loop()
+    else:
+        game_loop(args.level)
@@ -1,110 +1,111 @@
 import pygame
-from objs import Tile, Room, Chest, Entity, Enemy, Weapon, HealthPotion, DamagePotion, LuckPotion
-from random import randint, choice
+from objs import Grid, OccupancyIndex, Room, Chest, Entity, Enemy
+import random
 from sort import merge_sort
 
-pygame.init()  # Initialise PyGame
 
+class MapGenerationError(Exception):
+    """Raised when the rooms needed for a map can't be placed"""
 
-def check_tiles(tiles):
+
+def check_tiles(occupancy, x1, y1, x2, y2):
     """
     Check the specified tiles to see if any of them are already occupied by a room tile
-    :param tiles: the tiles to be checked
-    :type tiles: list
+    :param occupancy: the occupancy index of the map being checked
+    :type occupancy: OccupancyIndex
+    :param x1: the x coord of the left of the tiles
+    :type x1: int
+    :param y1: the y coord of the top of the tiles
+    :type y1: int
+    :param x2: the x coord just after the right of the tiles
+    :type x2: int
+    :param y2: the y coord just after the bottom of the tiles
+    :type y2: int
     :returns: False if one of the tiles is already by a room tile and True if no tiles are occupied by a floor tile
     """
-    for row in tiles:  # For each list of tiles
-        for tile in row:  # For each individual tile
-            if tile.floor_tile is True:  # If it is already a floor tile
-                return False  # End the function and return False
-    return True  # If every tile has been checked and none are floor tiles then return True
+    if occupancy.count(x1, y1, x2, y2) > 0:  # If any of them are already floor tiles
+        return False
+    return True  # If none of them are floor tiles then return True
 
 
 def generate_tunnel_x_pos(new_map, target, x, y):
     """
-    Recursive function that tunnels to a targets x value by removing the tiles block path attribute, only works if the
-    starting x value is higher than the tunnels x value
+    Tunnels to a targets x value by removing the tiles block path attribute, only works if the starting x value is
+    lower than the targets x value
     :param new_map: list of tiles with properties
-    :type new_map: list
+    :type new_map: Grid
     :param target: the target x coord
     :type target: int
     :param x: the current x coord of the tunnel
     :type x: int
     :param y: the current y coord of the tunnel
     :type y: int
+    :return: the edited map and the x coord the tunnel finished at
     """
-    if x == target:  # If the tunnel has reached the target
-        return new_map, x  # Return the edited map
-    else:  # If not
-        new_map[x][y].block_path = False  # Remove the current tiles block_path attribute
-        new_map[x][y-1].block_path = False  # And the one next to it (creates a 2x wide tunnel)
-        return generate_tunnel_x_pos(new_map, target, x+1, y)  # Call the function again, but increase the x value by 1
+    new_map.connectivity.carve(x, y-1, target, y+1)  # Remove the block_path attribute of every tile from the
+    # current x up to the target, on the current row and the one next to it (creates a 2x wide tunnel)
+    return new_map, target
 
 
 def generate_tunnel_x_neg(new_map, target, x, y):
     """
-    Recursive function that tunnels to a targets x value by removing the tiles block path attribute, only works if the
-    target x value is lower than the tunnels x value
+    Tunnels to a targets x value by removing the tiles block path attribute, only works if the target x value is lower
+    than the tunnels x value
     :param new_map: list of tiles with properties
-    :type new_map: list
+    :type new_map: Grid
     :param target: the target x coord
     :type target: int
     :param x: the current x coord of the tunnel
     :type x: int
     :param y: the current y coord of the tunnel
     :type y: int
+    :return: the edited map and the x coord the tunnel finished at
     """
-    if x == target:
-        return new_map, x
-    else:
-        new_map[x][y].block_path = False
-        new_map[x][y-1].block_path = False
-        return generate_tunnel_x_neg(new_map, target, x-1, y)  # Call the function again, but decrease the x value by 1
+    new_map.connectivity.carve(target+1, y-1, x+1, y+1)  # Every tile from the current x down to just after the
+    # target
+    return new_map, target
 
 
 def generate_tunnel_y_pos(new_map, target, x, y):
     """
-    Recursive function that tunnels to a targets y value by removing the tiles block path attribute, only works if the
-    target y value is higher than tunnels y value
+    Tunnels to a targets y value by removing the tiles block path attribute, only works if the target y value is
+    higher than tunnels y value
     :param new_map: list of tiles with properties
-    :type new_map: list
+    :type new_map: Grid
     :param target: the target y coord
     :type target: int
     :param x: the current x coord of the tunnel
     :type x: int
     :param y: the current y coord of the tunnel
     :type y: int
+    :return: the edited map
     """
-    if y == target:
-        return new_map
-    else:
-        new_map[x][y].block_path = False
-        new_map[x+1][y].block_path = False
-        return generate_tunnel_y_pos(new_map, target, x, y+1)  # Call the function again, but increase the y value by 1
+    new_map.connectivity.carve(x, y, x+2, target)  # Every tile from the current y up to the target, on the current
+    # column and the one next to it
+    return new_map
 
 
 def generate_tunnel_y_neg(new_map, target, x, y):
     """
-    Recursive function that tunnels to a targets y value by removing the tiles block path attribute, only works if the
-    target y value is lower than the tunnels y value
+    Tunnels to a targets y value by removing the tiles block path attribute, only works if the target y value is
+    lower than the tunnels y value
     :param new_map: list of tiles with properties
-    :type new_map: list
+    :type new_map: Grid
     :param target: the target y coord
     :type target: int
     :param x: the current x coord of the tunnel
     :type x: int
     :param y: the current y coord of the tunnel
     :type y: int
+    :return: the edited map
     """
-    if y == target:
-        return new_map
-    else:
-        new_map[x][y].block_path = False
-        new_map[x+1][y].block_path = False
-        return generate_tunnel_y_neg(new_map, target, x, y-1)  # Call the function again, but decrease the y value by 1
+    new_map.connectivity.carve(x, target+1, x+2, y+1)  # Every tile from the current y down to just after the
+    # target
+    return new_map
 
 
-def create_map(room_num, map_height, map_width, min_room_width, max_room_width, min_room_height, max_room_height):
+def create_map(room_num, map_height, map_width, min_room_width, max_room_width, min_room_height, max_room_height,
+               max_attempts=1000, rng=random):
     """
     Creates a list of map tiles with properties
     :param room_num: the max number of rooms that can be drawn
@@ -121,50 +122,55 @@ def create_map(room_num, map_height, map_width, min_room_width, max_room_width,
     :type min_room_height: int
     :param max_room_height: the maximum room height
     :type max_room_height: int
+    :param max_attempts: the most rooms that will be tried before giving up on placing the two rooms the game needs
+    :type max_attempts: int
+    :param rng: where the random numbers come from, e.g. a random.Random with its own seed
+    :type rng: Random
     :return: a map with tiles that each have their own properties
+    :raises MapGenerationError: if two rooms still haven't been placed after max_attempts tries
     """
     # Generate the blank map
-    new_map = [[Tile(True, False, True, False, x, y, map_width, map_height)
-                for y in range(0, map_height)] for x in range(0, map_width)]
+    new_map = Grid(map_width, map_height)
     # Creates a map with nothing but wall tiles
     # Also makes all the tiles blank until it can be determined if they are a floor or wall tile
-    # It does this by creating a 2d array, with the x being the number of lists in the list,
-    # y being the index of every tile in each of those lists
+    # It does this by creating a 2d array for each tile property, with the x being the first index
+    # and y being the second, which can still be used like a list of lists (new_map[x][y])
 
     # Add the rooms to the map
     rooms = []  # This list contains all of the room objects in use
-    room_count = 0  # This counts how many rooms have been placed
+    room_count = 0  # This counts how many rooms have been tried
+    occupancy = OccupancyIndex(new_map)  # Counts the floor tiles in any rectangle of the map in constant time
     while room_count <= room_num or len(rooms) < 2:  # While there are less rooms than the max amount to be placed
         # or there are less than two rooms placed (which is required for the game to function)
+        if room_count >= max_attempts and len(rooms) < 2:  # Stop instead of trying forever if the rooms don't fit
+            raise MapGenerationError(f"only placed {len(rooms)} of 2 rooms after {room_count} attempts on a "
+                                     f"{map_width}x{map_height} map")
         room_count += 1
 
         # Generate room coords
-        x_coord = randint(2, map_width - max_room_width - 2)  # Generate a random x coord based on
+        x_coord = rng.randint(2, map_width - max_room_width - 2)  # Generate a random x coord based on
         # the max specified value
-        y_coord = randint(2, map_height - max_room_height - 2)  # Generate a random y coord based on
+        y_coord = rng.randint(2, map_height - max_room_height - 2)  # Generate a random y coord based on
         # the max specified value
         #  The start of the range is 1 to ensure that no rooms generate on the very edge of the map
         #  The end of the range is the map height/width take away the max room height/width - 1 to ensure that no rooms
         #  generate on the very edge of the map and that the rooms have enough space for their max potential size
-        width = randint(min_room_width, max_room_width)  # Generate a random room width based on the
+        width = rng.randint(min_room_width, max_room_width)  # Generate a random room width based on the
         # max specified value
-        height = randint(min_room_height, max_room_height)  # Generate a random room height based on the
+        height = rng.randint(min_room_height, max_room_height)  # Generate a random room height based on the
         # max specified values
 
         # Check if the room can be placed
-        x_range = new_map[x_coord-1:x_coord+width+2]  # Slice the map array to the x coords of the room
-        tiles = [y[y_coord-1: y_coord+height+2] for y in x_range]  # Slice that slice to the y coords of the room
-        #  The -1 and the +2 are added to the slices arguments to ensure
+        #  The -1 and the +2 are added to the rooms coords to ensure
         #  that rooms generate a reasonable distance from one another
-        if check_tiles(tiles) is True:  # If none of the specified tiles are already room tiles
-            x_coordinates = []  # This list will hold the lists of y coords
-            for x in range(x_coord, x_coord + width):  # For each x coord in the range of the room width
-                y_coordinates = []  # This list will hold the tuples of coords
-                for y in range(y_coord, y_coord + height):  # For each y coord in the range of the room height
-                    new_map[x][y].floor_tile = True  # Turn the tile to a floor tile
-                    new_map[x][y].block_path = False  # Make the tile no longer a wall tile
-                    y_coordinates.append((x, y))  # Add the coords to the list of y coords as a tuple
-                x_coordinates.append(y_coordinates)  # Add the list of tuples to the x coords
+        if check_tiles(occupancy, x_coord-1, y_coord-1, x_coord+width+2, y_coord+height+2) is True:
+            # If none of the specified tiles are already room tiles
+            new_map.floor[x_coord:x_coord+width, y_coord:y_coord+height] = True  # Turn the tiles to floor tiles
+            new_map.connectivity.carve(x_coord, y_coord, x_coord+width, y_coord+height)  # Make the tiles no longer
+            # wall tiles, which also connects them to any tunnel already running through or next to the room
+            occupancy.add(x_coord, y_coord, x_coord+width, y_coord+height)  # Add the room to the occupancy index
+            x_coordinates = [[(x, y) for y in range(y_coord, y_coord + height)]
+                             for x in range(x_coord, x_coord + width)]  # A list of coord tuples for each x coord
 
             # Tunnel to another room
             x_centre = x_coord + (width // 2)  # Calculate the x coord centre of the room
@@ -175,7 +181,7 @@ def create_map(room_num, map_height, map_width, min_room_width, max_room_width,
                     target_room = rooms[0]  # The target room is the first one to generate - this ensures that there is
                     # a tunnel to the first room
                 else:  # Else
-                    target_room = choice(rooms)  # Choose a random room to tunnel to
+                    target_room = rng.choice(rooms)  # Choose a random room to tunnel to
                 target_x = target_room.centre_x  # Target x value
                 target_y = target_room.centre_y  # Target y values
                 if room.centre_x <= target_x:  # If the target is x is higher than the rooms x
@@ -193,42 +199,28 @@ def create_map(room_num, map_height, map_width, min_room_width, max_room_width,
                         new_map = generate_tunnel_y_neg(new_map, target_y, tunnel_x+1, room.centre_y)  # Tunnel up
                     # Tunnel left
             rooms.append(room)  # Add the current room object to the list of rooms
+        else:  # If the room overlaps another room
+            new_map.rejected_rooms += 1
 
     # Make all valid tiles visible
-    for x in range(1, map_width-1):  # For each x coord (ignoring those on the boundary to avoid index error)
-        for y in range(1, map_height-1):  # For each y coord (ignoring those on the boundary to avoid index error)
-            if new_map[x][y].block_path is False:  # If it is not a wall tile
-                new_map[x][y].empty = False  # It will be shown to the screen
-            if new_map[x][y].block_path is True:  # If it is a wall tile
-                if new_map[x+1][y].block_path is False\
-                        or new_map[x-1][y].block_path is False\
-                        or new_map[x][y+1].block_path is False\
-                        or new_map[x][y-1].block_path is False\
-                        or new_map[x+1][y+1].block_path is False\
-                        or new_map[x+1][y-1].block_path is False\
-                        or new_map[x-1][y-1].block_path is False\
-                        or new_map[x-1][y+1].block_path is False:
-                    # If the tile to the right is a floor tile
-                    # or the one to the left
-                    # or the one below
-                    # or the one above
-                    # or the one diagonally right and down
-                    # or the one diagonally right and up
-                    # or the one diagonally left and up
-                    # or the one diagonally left and down
-                    new_map[x][y].empty = False  # The current tile will be shown to the screen
-                    # This means that only wall tiles on the borders of rooms will be shown
+    # A tile is shown if it or any of the 8 tiles around it is not a wall tile, which is the same as growing the
+    # floor by one tile in every direction (a 3x3 dilation), so that only wall tiles on the borders of rooms are shown
+    # The dilation is done as two passes of 3, first across x and then across y
+    path = ~new_map.wall  # The tiles that are not wall tiles
+    near_x = path[:-2] | path[1:-1] | path[2:]  # Tiles next to a path tile to the left or right (or one themselves)
+    near = near_x[:, :-2] | near_x[:, 1:-1] | near_x[:, 2:]  # And then next to one of those above or below
+    new_map.visible[1:-1, 1:-1] = near  # Tiles on the boundary are left empty
 
     return new_map, rooms
 
 
 def spawn_map(new_map, rooms, loot_chance, max_loot_num, enemy_chance, max_enemy_num, max_enemy_health,
               max_enemy_damage, ladder, chest, enemy_left, enemy_right, enemy_left_attack, enemy_right_attack,
-              loot_items, item_font, player_luck):
+              loot_table, item_font, player_luck, rng=random, loot_rng=None):
     """
     Choose the spawn location for things on the map such as the player and loot chests
     :param new_map: the list of map tiles with their properties
-    :type new_map: list
+    :type new_map: Grid
     :param rooms: list of room objects
     :type rooms: list
     :param loot_chance: the chance that loot will spawn out of 10
@@ -255,35 +247,35 @@ def spawn_map(new_map, rooms, loot_chance, max_loot_num, enemy_chance, max_enemy
     :type enemy_left_attack: list
     :param enemy_right_attack: the right-facing attack of an enemy
     :type enemy_right_attack: list
-    :param loot_items: dictionary of loot items that will spawn
-    :type loot_items: dict
+    :param loot_table: the loot that can spawn in the chests and how often each one does
+    :type loot_table: LootTable
     :param item_font: the values for the item font, colour, type, etc
     :type item_font: tuple
     :param player_luck: the players luck stat
     :type player_luck: float
+    :param rng: where the random numbers come from, e.g. a random.Random with its own seed
+    :type rng: Random
+    :param loot_rng: where the random numbers for the loots values come from, if None then rng is used
+    :type loot_rng: Random
     :returns: a list of tiles that now have spawn locations, the players spawn coords, the exit location,
     a list of sorted rooms, a list of Enemy objects, and a list of Chest objects
     """
-    distances = [room.distance for room in rooms]  # Create a list of the rooms distances
-    distances = merge_sort(distances)  # Sort those from smallest to largest
-    sorted_rooms = []  # This list is used to store the rooms objects but in order of smallest to largest distance
-    for distance in distances:  # For each distance
-        for room in rooms:  # For each room
-            if room.distance == distance:  # If the current rooms distance is the next one in order
-                sorted_rooms.append(room)  # Add it to the sorted list
-                break  # Break the loop to avoid adding rooms multiple times if different rooms have the same distance
+    if loot_rng is None:
+        loot_rng = rng
+    sorted_rooms = merge_sort(rooms, key=lambda room: room.distance)  # The rooms in order of smallest to largest
+    # distance, rooms with the same distance stay in the order they were placed in
     player_x = sorted_rooms[0].centre_x  # Set the players x coord to the room centre that has the smallest distance
     player_y = sorted_rooms[0].centre_y  # Same for the y coord
     exit_x = sorted_rooms[-1].centre_x  # Set the exit to the room centre that has the largest distance
     exit_y = sorted_rooms[-1].centre_y  # Same for the y coord
-    if (player_x, player_y) == (exit_x, exit_y):
-        exit_x = sorted_rooms[1].centre_x
-        exit_y = sorted_rooms[1].centre_y
+    connectivity = new_map.connectivity  # Used to only spawn things where the player can get to them
+    new_map.index_rooms(sorted_rooms)  # Give each room a pool of its free tiles to spawn things on
     exit_point = Entity(exit_x, exit_y, ladder)
     new_map[exit_x][exit_y].occupied = True  # Make it so that the exit tile cannot be walked through
     new_map[exit_x][exit_y].object = exit_point
 
-    enemy_sprites = [(enemy_left, enemy_left_attack), (enemy_right, enemy_right_attack)]
+    # The sprite, attack and whether the enemy faces right for each direction an enemy can spawn facing
+    enemy_sprites = [(enemy_left, enemy_left_attack, False), (enemy_right, enemy_right_attack, True)]
     # Create a list of enemy sprites to allow randomisation of their direction
     enemies = []  # List of enemy objects
     chests = []  # List of chest objects
@@ -291,70 +283,39 @@ def spawn_map(new_map, rooms, loot_chance, max_loot_num, enemy_chance, max_enemy
     font_x, font_y = font_coords
     for num in range(0, int(player_luck)+1, 2):  # For every 2 of the players luck
         max_loot_num += 1  # Increase the max amount of loot that can spawn per room
-    for room in sorted_rooms:  # For each room
-        if sorted_rooms.index(room) != 0:  # If the room is not the same as the one the player will spawn in
+    player_room = sorted_rooms[0].free_tiles
+    player_room.remove((player_x, player_y))  # Nothing can spawn on the tile the player spawns on
+    for room_number, room in enumerate(sorted_rooms):  # For each room
+        free_tiles = room.free_tiles  # The tiles in the room that nothing has spawned on yet
+        if not connectivity.connected((room.centre_x, room.centre_y), (player_x, player_y)):
+            continue  # Don't spawn anything in a room the player can't get to
+        if room_number != 0:  # If the room is not the same as the one the player will spawn in
             for _ in range(0, max_enemy_num):  # For the max amount of enemies that can spawn
-                chance = randint(0, 10)  # The chance an enemy will spawn
-                if chance <= enemy_chance:  # If an enemy will spawn
-                    searching = True
-                    attempts = 0
-                    while searching and attempts < 6:  # While searching for a spot to place an enemy
-                        # and it has been attempted less than 6 times
-                        attempts += 1
-                        tiles = choice(room.tiles)  # Choose a random tile row from the rooms tiles
-                        tile = choice(tiles)  # Choose a random tile in that row
-                        x, y = tile  # Tiles x and y coordinates
-                        if new_map[x][y].occupied is False and new_map[x][y].block_path is False:  # If the tile
-                            # isn't already occupied and isn't a wall tile
-                            enemy_sprite_direction = choice(enemy_sprites)  # Choose a random direction
-                            # for the enemy to spawn in facing
-                            enemy_sprite, enemy_attack = enemy_sprite_direction  # Unpack the sprite and attack from it
-                            enemy_health = randint(1, max_enemy_health)  # Generate random health value for enemy
-                            enemy_damage = randint(1, max_enemy_damage)  # Generate random damage value for enemy
-                            new_enemy = Enemy(x, y, enemy_health, enemy_damage, enemy_sprite, enemy_attack)
-                            # Create the new enemy object
-                            enemies.append(new_enemy)  # Add it to the list
-                            new_map[x][y].object = new_enemy  # Set it as the object for the tiles it spawned on
-                            new_map[x][y].occupied = True  # Set the tile it spawned on as occupied
-                            searching = False  # Stop searching for a place to spawn an enemy
+                chance = rng.randint(0, 10)  # The chance an enemy will spawn
+                if chance <= enemy_chance and len(free_tiles) > 0:  # If an enemy will spawn and there is space
+                    x, y = free_tiles.choose(rng)  # Choose a random free tile in the room
+                    enemy_sprite_direction = rng.choice(enemy_sprites)  # Choose a random direction
+                    # for the enemy to spawn in facing
+                    enemy_sprite, enemy_attack, facing_right = enemy_sprite_direction  # Unpack the direction
+                    enemy_health = rng.randint(1, max_enemy_health)  # Generate random health value for enemy
+                    enemy_damage = rng.randint(1, max_enemy_damage)  # Generate random damage value for enemy
+                    new_enemy = Enemy(x, y, enemy_health, enemy_damage, enemy_sprite, enemy_attack, facing_right)
+                    # Create the new enemy object
+                    enemies.append(new_enemy)  # Add it to the list
+                    new_map[x][y].object = new_enemy  # Set it as the object for the tiles it spawned on
+                    new_map[x][y].occupied = True  # Set the tile it spawned on as occupied, which also takes it out
+                    # of the rooms free tiles
         for _ in range(0, max_loot_num):  # For the max amount of loot that can spawn
-            chance = randint(0, 10)  # The chance that loot will spawn
-            if chance <= loot_chance:  # If it will spawn
-                searching = True
-                attempts = 0
-                while searching and attempts < 6:  # While searching for a spot to place loot
-                    # and it has been attempted less that 6 times
-                    attempts += 1
-                    tiles = choice(room.tiles)  # Select a random column to place the loot
-                    tile = choice(tiles)  # Select a random tile in that column
-                    x, y = tile  # Unpack the x and y values from the tuple
-                    if new_map[x][y].occupied is False and tile != (player_x, player_y)\
-                            and new_map[x][y].block_path is False:
-                        # If the tile isn't occupied
-                        # and it isn't the tile that the player spawns on
-                        loot_type = choice(['weapons', 'blue potions', 'red potions', 'green potions'])
-                        loot = choice(loot_items[loot_type])
-                        if loot_type == 'weapons':
-                            item = Weapon(x, y, loot['sprite'], loot['name'], 1, loot['min damage'],
-                                          loot['max damage'], font_x, font_y, font, colour)
-                        elif loot_type == 'blue potions':
-                            item = DamagePotion(x, y, loot['sprite'], loot['name'], 1, loot['min value'],
-                                                loot['max value'], font_x, font_y, font, colour)
-                        elif loot_type == 'red potions':
-                            item = HealthPotion(x, y, loot['sprite'], loot['name'], 1, loot['min value'],
-                                                loot['max value'], font_x, font_y, font, colour)
-                        elif loot_type == 'green potions':
-                            item = LuckPotion(x, y, loot['sprite'], loot['name'], 0.1, loot['min value'],
-                                              loot['max value'], font_x, font_y, font, colour)
-                        else:
-                            item = Weapon(x, y, ladder, '', 0, 0, 1, font_x, font_y, font, colour)
-                            # Default item if no valid loot type is found
-                        item.generate_value()  # Generate a value for the item
-                        new_chest = Chest(x, y, chest, item)
-                        chests.append(new_chest)  # Add a new chest object to the list of chests
-                        new_map[x][y].occupied = True  # Make the tile occupied
-                        new_map[x][y].object = new_chest  # Make the tile a chest tile
-                        searching = False  # Stop searching for a space to put the chest
+            chance = rng.randint(0, 10)  # The chance that loot will spawn
+            if chance <= loot_chance and len(free_tiles) > 0:  # If it will spawn and there is space
+                x, y = free_tiles.choose(rng)  # Choose a random free tile in the room
+                item = loot_table.create(x, y, font_x, font_y, font, colour, rng, loot_rng)  # Pick the loot and
+                # generate a value for it
+                new_chest = Chest(x, y, chest, item)
+                chests.append(new_chest)  # Add a new chest object to the list of chests
+                new_map[x][y].occupied = True  # Make the tile occupied
+                new_map[x][y].object = new_chest  # Make the tile a chest tile
+    player_room.add((player_x, player_y))  # The players tile can be spawned on again once the player moves off it
     return new_map, player_x, player_y, exit_point, sorted_rooms, enemies, chests
 
 
@@ -362,7 +323,7 @@ def draw_map(map_to_draw, screen, map_width, map_height, cell_width, cell_height
     """
     Draws the finished map with the correct properties for each tile
     :param map_to_draw: the list of tiles with their properties
-    :type map_to_draw: list
+    :type map_to_draw: Grid
     :param screen: the screen to be drawn to
     :type screen: surface
     :param map_width: the height of the map in tiles
@@ -378,15 +339,32 @@ def draw_map(map_to_draw, screen, map_width, map_height, cell_width, cell_height
     :param floor: the sprite for a floor tile
     :type floor: surface
     """
-    for x in range(0, map_width):  # For each x coord
-        for y in range(0, map_height):  # For each y coord
-            # The tiles are drawn by multiplying their x and y the specified cell width and height to convert
-            # the map address to a pixel on the screen
-            if map_to_draw[x][y].empty is False:  # If the tile can be drawn
-                if map_to_draw[x][y].block_path is True:  # If the tile
-                    # blocks the players path
-                    screen.blit(wall, (x * cell_width, y * cell_height))  # Draw a wall tile
-                elif map_to_draw[x][y].floor_tile is True:  # If the tile is part of a room
-                    screen.blit(floor, (x * cell_width, y * cell_height))  # Draw a floor tile
-                else:  # If none of the above
-                    screen.blit(floor, (x * cell_width, y * cell_height))  # Draw a floor tile
+    walls = map_to_draw.visible & map_to_draw.wall  # The tiles that can be drawn and block the players path
+    floors = map_to_draw.visible & ~map_to_draw.wall  # The tiles that can be drawn and can be walked on
+    # The tiles are drawn by multiplying their x and y the specified cell width and height to convert
+    # the map address to a pixel on the screen
+    for x, y in zip(*walls.nonzero()):  # For each wall tile
+        screen.blit(wall, (x * cell_width, y * cell_height))  # Draw a wall tile
+    for x, y in zip(*floors.nonzero()):  # For each floor or tunnel tile
+        screen.blit(floor, (x * cell_width, y * cell_height))  # Draw a floor tile
+
+
+def render_map(map_to_draw, cell_width, cell_height, wall, floor):
+    """
+    Draw the map tiles once onto a surface of their own, since they don't change while the level is played, so each
+    frame only has to copy the part of it that can be seen
+    :param map_to_draw: the list of tiles with their properties
+    :type map_to_draw: Grid
+    :param cell_width: the width of a cell
+    :type cell_width: int
+    :param cell_height: the height of a cell
+    :type cell_height: int
+    :param wall: the sprite for a wall tile
+    :type wall: surface
+    :param floor: the sprite for a floor tile
+    :type floor: surface
+    :return: the surface with the map drawn on it
+    """
+    terrain = pygame.Surface((map_to_draw.width * cell_width, map_to_draw.height * cell_height))
+    draw_map(map_to_draw, terrain, map_to_draw.width, map_to_draw.height, cell_width, cell_height, wall, floor)
+    return terrain
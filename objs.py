@@ -1,96 +1,462 @@
 import pygame
-from random import randint, uniform
-from math import dist
-from sort import find_shortest_path
+import numpy as np
+import random
+from assets import TextCache
 
 
-pygame.init()  # Initialise PyGame
+class Grid:
+    """
+    Holds the map as layers of numpy arrays with one value per tile in each, rather than a Tile object per tile.
+    Indexing it the same way as a list of lists (new_map[x][y]) gives a Tile that reads and writes these layers
+    """
 
+    class Column:
+        """Represents one x coordinate of the grid, so that new_map[x][y] works"""
 
-class Tile:
-    """Description - represents every tile and its properties"""
-
-    class Vertex:
-        """Represents the tiles vertex"""
-
-        def __init__(self, x, y, adjacent_vertices):
+        def __init__(self, grid, x):
             """
-            :param x: x coord
+            :param grid: the grid the column belongs to
+            :type grid: Grid
+            :param x: the columns x coord
             :type x: int
-            :param y: y coord
-            :type y: int
-            :param adjacent_vertices: a dictionary of adjacent coordinates and the distance to them
-            :type adjacent_vertices: dict
-            """
-            self.coords = (x, y)  # Vertexes coordinates
-            self.g = 0  # Distance from start
-            self.h = 0  # Heuristic (estimated) distance to end
-            self.f = 0  # Total of g and h
-            self.adjacent_vertices = adjacent_vertices  # The vertices adjacent to this one and the distance to them
-            self.parent = None  # The parent of this vertex
-
-        def calculate_values(self, end_vertex, total_distance=0, distance=0):
-            """
-            Calculates the g, h, and f values of the vertex
-            :param end_vertex: the target vertex
-            :type end_vertex: tuple
-            :param total_distance: the total distance already travelled to get to the current vertex
-            :type total_distance: float
-            :param distance: the distance from the previous vertex to this one
-            :type distance: float
-            """
-            self.g = distance + total_distance  # G cost is equal the distance from the previous vertex
-            # plus the total distance already travelled
-            x, y = self.coords  # Vertices x and y coords
-            end_x, end_y = end_vertex  # End vertices x and y coordinates
-            self.h = (x - end_x) + (y - end_y)  # H or heuristic cost is the estimated distance to the end vertex,
-            # here it is calculated using its manhattan distance
-            self.f = self.g + self.h  # F value is equal to the g cost plus the h cost
-
-        def set_parent(self, parent):
-            """
-            Set a new parent for this vertex; this is used to trace the path taken from the start vertex to the end
-            :param parent: the vertex that this one originated from
-            :type parent: Vertex
             """
-            self.parent = parent
-
-    def __init__(self, block_path, floor_tile, empty, occupied, x, y, map_height, map_width):
-        """
-        :param block_path: determines if a tile blocks the players path
-        :type block_path: bool
-        :param floor_tile: checks if the tile belongs to another room
-        :type floor_tile: bool
-        :param empty: determines if a tile is empty
-        :type empty: bool
-        :param occupied: determines if a tile is occupied by something
-        :type occupied: bool
+            self.__grid = grid
+            self.__x = x
+
+        def __getitem__(self, y):
+            if y >= self.__grid.height:  # Stops at the end of the column the same way a list would
+                raise IndexError("tile index out of range")
+            return Tile(self.__grid, self.__x, y)
+
+        def __len__(self):
+            return self.__grid.height
+
+        def __iter__(self):
+            for y in range(0, self.__grid.height):
+                yield Tile(self.__grid, self.__x, y)
+
+    def __init__(self, map_width, map_height):
+        """
+        :param map_width: the width of the map
+        :type map_width: int
+        :param map_height: the height of the map
+        :type map_height: int
+        """
+        self.width = map_width
+        self.height = map_height
+        self.wall = np.ones((map_width, map_height), dtype=bool)  # Tiles that block the players path
+        self.floor = np.zeros((map_width, map_height), dtype=bool)  # Tiles that belong to a room
+        self.visible = np.zeros((map_width, map_height), dtype=bool)  # Tiles that are drawn to the screen
+        self.occupied = np.zeros((map_width, map_height), dtype=bool)  # Tiles that are occupied by something
+        self.object_id = np.zeros((map_width, map_height), dtype=np.int32)  # Index of the object on each tile
+        self.objects = [None]  # The objects on the map, an object id of 0 means there is no object
+        self.__free_ids = []  # Ids in the objects list that are no longer being used
+        self.rejected_rooms = 0  # The number of rooms that couldn't be placed when the map was created
+        self.connectivity = Connectivity(self)  # Which of the tiles that aren't wall tiles are connected
+        self.room_id = np.zeros((map_width, map_height), dtype=np.int16)  # 1 + the index of the room each tile is in,
+        # 0 for tiles that aren't in an indexed room
+        self.free_tiles = [None]  # The free tiles of each indexed room, by room id
+
+    def __getitem__(self, x):
+        if x >= self.width:  # Stops at the end of the grid the same way a list would
+            raise IndexError("column index out of range")
+        return self.Column(self, x)
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        for x in range(0, self.width):
+            yield self.Column(self, x)
+
+    def get_object(self, x, y):
+        """
+        Get the object on a tile
         :param x: the tiles x coord
         :type x: int
         :param y: the tiles y coord
         :type y: int
-        :param map_height: the map height
-        :type map_height: int
-        :param map_width: the map width
-        :type map_width: int
+        :return: the object, or None if there isn't one
         """
-        self.block_path = block_path
-        self.floor_tile = floor_tile
-        self.empty = empty
-        self.occupied = occupied
-        self.object = None  # Aggregates the tile with objects that spawn on it
-        adjacent_vertices = {}
-        # The following if statements ensures that only adjacent vertices that are in the lists index
-        # can be counted as adjacent
-        if x > 0:
-            adjacent_vertices.update({(x-1, y): 1})
-        if x < map_width - 1:
-            adjacent_vertices.update({(x+1, y): 1})
-        if y > 0:
-            adjacent_vertices.update({(x, y-1): 1})
-        if y < map_height - 1:
-            adjacent_vertices.update({(x, y+1): 1})
-        self.vertex = self.Vertex(x, y, adjacent_vertices)
+        return self.objects[self.object_id[x, y]]
+
+    def set_object(self, x, y, entity):
+        """
+        Set the object on a tile
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        :param entity: the object, or None to remove the object on the tile
+        :type entity: Entity
+        """
+        old_id = self.object_id[x, y]
+        if old_id != 0:  # Free the id of the object that was on the tile
+            self.objects[old_id] = None
+            self.__free_ids.append(old_id)
+        if entity is None:
+            self.object_id[x, y] = 0
+        else:
+            if len(self.__free_ids) > 0:
+                new_id = self.__free_ids.pop()
+                self.objects[new_id] = entity
+            else:
+                new_id = len(self.objects)
+                self.objects.append(entity)
+            self.object_id[x, y] = new_id
+
+    def objects_in(self, x1, y1, x2, y2):
+        """
+        Get the objects on the tiles in a rectangle, any part of the rectangle that is off the map is ignored
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        :return: a list of the objects
+        """
+        x1 = max(x1, 0)  # So that a negative coord doesn't count from the other end of the map
+        y1 = max(y1, 0)
+        object_ids = self.object_id[x1:x2, y1:y2]
+        return [self.objects[object_id] for object_id in object_ids[object_ids != 0].tolist()]
+
+    def set_occupied(self, x, y, value):
+        """
+        Set whether a tile is occupied, keeping the free tiles of the room it is in up to date
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        :param value: whether the tile is occupied
+        :type value: bool
+        """
+        self.occupied[x, y] = value
+        room_id = self.room_id.item(x, y)
+        if room_id != 0:  # If the tile is in a room
+            if value:
+                self.free_tiles[room_id].remove((x, y))
+            else:
+                self.free_tiles[room_id].add((x, y))
+
+    def index_rooms(self, rooms):
+        """
+        Give each room a pool of its tiles that are free (not a wall tile and not occupied), which set_occupied then
+        keeps up to date as things move around or are removed
+        :param rooms: the rooms on the map
+        :type rooms: list
+        """
+        self.room_id[:] = 0
+        self.free_tiles = [None]
+        for room_id, room in enumerate(rooms, 1):
+            x1, y1 = room.tiles[0][0]  # Rooms are rectangles, so the first and last tiles are opposite corners
+            x2, y2 = room.tiles[-1][-1]
+            self.room_id[x1:x2+1, y1:y2+1] = room_id
+            free_x, free_y = (~(self.wall[x1:x2+1, y1:y2+1] | self.occupied[x1:x2+1, y1:y2+1])).nonzero()
+            room.free_tiles = FreeTiles(zip((free_x + x1).tolist(), (free_y + y1).tolist()))
+            self.free_tiles.append(room.free_tiles)
+
+    def flat_layers(self):
+        """
+        Get copies of the wall and occupied layers as bytes, one byte per tile at index x * height + y, which are
+        much quicker than the arrays to read one tile at a time (e.g. when searching for a path)
+        :return: the wall layer and the occupied layer
+        """
+        return self.wall.tobytes(), self.occupied.tobytes()
+
+
+class Tile:
+    """Description - represents a tile and its properties, which are stored in the layers of a Grid"""
+
+    def __init__(self, grid, x, y):
+        """
+        :param grid: the grid the tile belongs to
+        :type grid: Grid
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        """
+        self.__grid = grid
+        self.__x = x
+        self.__y = y
+
+    @property
+    def block_path(self):
+        """Determines if a tile blocks the players path"""
+        return bool(self.__grid.wall[self.__x, self.__y])
+
+    @block_path.setter
+    def block_path(self, value):
+        self.__grid.wall[self.__x, self.__y] = value
+
+    @property
+    def floor_tile(self):
+        """Checks if the tile belongs to a room"""
+        return bool(self.__grid.floor[self.__x, self.__y])
+
+    @floor_tile.setter
+    def floor_tile(self, value):
+        self.__grid.floor[self.__x, self.__y] = value
+
+    @property
+    def empty(self):
+        """Determines if a tile is empty (not drawn to the screen)"""
+        return not self.__grid.visible[self.__x, self.__y]
+
+    @empty.setter
+    def empty(self, value):
+        self.__grid.visible[self.__x, self.__y] = not value
+
+    @property
+    def occupied(self):
+        """Determines if a tile is occupied by something"""
+        return bool(self.__grid.occupied[self.__x, self.__y])
+
+    @occupied.setter
+    def occupied(self, value):
+        self.__grid.set_occupied(self.__x, self.__y, value)
+
+    @property
+    def object(self):
+        """The object that has spawned on the tile"""
+        return self.__grid.get_object(self.__x, self.__y)
+
+    @object.setter
+    def object(self, entity):
+        self.__grid.set_object(self.__x, self.__y, entity)
+
+
+class OccupancyIndex:
+    """
+    A summed-area table of the room tiles on a grid, where each value is the number of room tiles above and to the left
+    of it. This means checking how many room tiles are inside a rectangle only needs 4 values however big it is
+    """
+
+    def __init__(self, grid):
+        """
+        :param grid: the grid whose room tiles are counted
+        :type grid: Grid
+        """
+        self.__grid = grid
+        self.__table = np.zeros((grid.width + 1, grid.height + 1), dtype=np.int32)  # An extra row and column of 0s
+        # so that rectangles touching the edge of the map don't need checking separately
+        self.__steps_x = np.arange(0, grid.width + 1, dtype=np.int32)  # The x and y index of each value in the table
+        self.__steps_y = np.arange(0, grid.height + 1, dtype=np.int32)
+
+    def add(self, x1, y1, x2, y2):
+        """
+        Add a rectangle of room tiles to the table, which must not overlap any rectangle that has already been added
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        """
+        # Every value below and to the right of the rectangle goes up by how much of the rectangle is above and to the
+        # left of it, which is how much of its width is to the left times how much of its height is above
+        widths = np.minimum(self.__steps_x[x1 + 1:] - x1, x2 - x1)
+        heights = np.minimum(self.__steps_y[y1 + 1:] - y1, y2 - y1)
+        self.__table[x1 + 1:, y1 + 1:] += np.outer(widths, heights)
+
+    def count(self, x1, y1, x2, y2):
+        """
+        Count the floor tiles in a rectangle, any part of the rectangle that is off the map is ignored
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        :return: the number of floor tiles
+        """
+        x1 = min(max(x1, 0), self.__grid.width)
+        x2 = min(max(x2, x1), self.__grid.width)
+        y1 = min(max(y1, 0), self.__grid.height)
+        y2 = min(max(y2, y1), self.__grid.height)
+        table = self.__table
+        return table.item(x2, y2) - table.item(x1, y2) - table.item(x2, y1) + table.item(x1, y1)
+
+
+class Connectivity:
+    """
+    Keeps track of which tiles that aren't wall tiles are connected to each other, using a union-find (disjoint set)
+    of the rectangles carved out of the grid. Each tile remembers the last rectangle that carved it and rectangles
+    that overlap or touch are joined into the same set, so checking if two tiles are connected only needs the roots
+    of their two rectangles rather than a search
+    """
+
+    def __init__(self, grid):
+        """
+        :param grid: the grid whose connected tiles are tracked
+        :type grid: Grid
+        """
+        self.__grid = grid
+        self.__region = np.zeros((grid.width, grid.height), dtype=np.int32)  # The rectangle each tile belongs to,
+        # 0 for wall tiles
+        self.__parent = [0]  # The parent of each rectangle in the union-find, rectangle 0 is every wall tile
+        self.__size = [0]  # The number of rectangles in each set, only correct for the roots
+        self.__stale = False  # Whether the wall layer has been changed without the rectangles being updated
+
+    def __find(self, region):
+        """
+        Find the root of the set a rectangle belongs to, pointing every rectangle on the way straight at the root
+        :param region: the rectangles number
+        :type region: int
+        :return: the number of the root rectangle
+        """
+        parent = self.__parent
+        root = region
+        while parent[root] != root:
+            root = parent[root]
+        while parent[region] != root:  # Shorten the path so the next find is quicker
+            parent[region], region = root, parent[region]
+        return root
+
+    def __union(self, region_1, region_2):
+        """
+        Join the sets two rectangles belong to, the smaller set is added to the bigger one
+        :param region_1: the first rectangles number
+        :type region_1: int
+        :param region_2: the second rectangles number
+        :type region_2: int
+        """
+        root_1 = self.__find(region_1)
+        root_2 = self.__find(region_2)
+        if root_1 == root_2:  # They are already connected
+            return
+        if self.__size[root_1] < self.__size[root_2]:
+            root_1, root_2 = root_2, root_1
+        self.__parent[root_2] = root_1
+        self.__size[root_1] += self.__size[root_2]
+
+    def __add(self, x1, y1, x2, y2):
+        """
+        Add a rectangle that is no longer wall tiles, joining it to every rectangle it overlaps or is next to (not
+        diagonally)
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        :return: False if the rectangle is empty and True if it was added
+        """
+        width = self.__grid.width
+        height = self.__grid.height
+        x1 = min(max(x1, 0), width)
+        x2 = min(max(x2, x1), width)
+        y1 = min(max(y1, 0), height)
+        y2 = min(max(y2, y1), height)
+        if x1 == x2 or y1 == y2:  # Nothing to carve
+            return False
+        new_region = len(self.__parent)
+        self.__parent.append(new_region)
+        self.__size.append(1)
+        region = self.__region
+        near_x1 = max(x1 - 1, 0)  # The rectangle grown by a tile on each side, clipped to the grid
+        near_y1 = max(y1 - 1, 0)
+        near = region[near_x1:x2 + 1, near_y1:y2 + 1].copy()
+        if near_x1 < x1 and near_y1 < y1:  # Tiles that are only diagonal to the rectangle aren't next to it
+            near[0, 0] = 0
+        if near_x1 < x1 and y2 < height:
+            near[0, -1] = 0
+        if x2 < width and near_y1 < y1:
+            near[-1, 0] = 0
+        if x2 < width and y2 < height:
+            near[-1, -1] = 0
+        for other in set(near.ravel().tolist()):  # The rectangles inside it and along each of its sides
+            if other != 0:  # Wall tiles aren't connected to anything
+                self.__union(new_region, other)
+        region[x1:x2, y1:y2] = new_region
+        return True
+
+    def carve(self, x1, y1, x2, y2):
+        """
+        Turn a rectangle of the grid into tiles that can be walked through and connect it to the tiles it touches,
+        any part of the rectangle that is off the grid is ignored
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        """
+        if self.__stale:
+            self.__rebuild()
+        x1 = max(x1, 0)  # So that a negative coord doesn't count from the other end of the grid
+        y1 = max(y1, 0)
+        if self.__add(x1, y1, x2, y2):
+            self.__grid.wall[x1:x2, y1:y2] = False
+
+    def close(self, x1, y1, x2, y2):
+        """
+        Turn a rectangle of the grid back into wall tiles. A union-find can't split sets, so the connections are
+        worked out again from the wall layer the next time they are needed
+        :param x1: the x coord of the left of the rectangle
+        :type x1: int
+        :param y1: the y coord of the top of the rectangle
+        :type y1: int
+        :param x2: the x coord just after the right of the rectangle
+        :type x2: int
+        :param y2: the y coord just after the bottom of the rectangle
+        :type y2: int
+        """
+        self.__grid.wall[max(x1, 0):max(x2, 0), max(y1, 0):max(y2, 0)] = True
+        self.changed()
+
+    def changed(self):
+        """Call after writing to the grids wall layer directly (e.g. loading a saved map) so it is read again"""
+        self.__stale = True
+
+    def __rebuild(self):
+        """Work out the connections again from the wall layer, with each run of tiles down a column as a rectangle"""
+        self.__region[:] = 0
+        self.__parent = [0]
+        self.__size = [0]
+        self.__stale = False
+        path = np.zeros((self.__grid.width, self.__grid.height + 2), dtype=np.int8)
+        path[:, 1:-1] = ~self.__grid.wall
+        starts_x, starts_y = (np.diff(path, axis=1) == 1).nonzero()  # Where each run starts and ends
+        _, ends_y = (np.diff(path, axis=1) == -1).nonzero()
+        for x, y1, y2 in zip(starts_x.tolist(), starts_y.tolist(), ends_y.tolist()):
+            self.__add(x, y1, x + 1, y2)
+
+    def component(self, x, y):
+        """
+        Get the number of the group of connected tiles a tile belongs to
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        :return: the group number, 0 for wall tiles
+        """
+        if self.__stale:
+            self.__rebuild()
+        return self.__find(self.__region.item(x, y))
+
+    def connected(self, start, end):
+        """
+        Check if there is a path between two tiles, ignoring anything that is occupying the tiles on the way
+        :param start: the first tiles x and y coords
+        :type start: tuple
+        :param end: the second tiles x and y coords
+        :type end: tuple
+        :return: True if neither tile is a wall tile and there is a path between them, False if not
+        """
+        start_component = self.component(*start)
+        return start_component != 0 and start_component == self.component(*end)
 
 
 class Room:
@@ -109,6 +475,62 @@ class Room:
         self.centre_x = centre_x
         self.centre_y = centre_y
         self.distance = centre_x + centre_y  # The rooms distance form the origin
+        self.free_tiles = None  # The rooms tiles that nothing is on, set when the map indexes its rooms
+
+
+class FreeTiles:
+    """
+    A pool of the tiles in a room that nothing is on. The tiles are kept in a list with the index of each one in a
+    dictionary, so a tile is removed by moving the last tile into its place, and adding, removing and choosing a
+    random tile all take constant time
+    """
+
+    def __init__(self, tiles=()):
+        """
+        :param tiles: the tiles that start off free as tuples
+        :type tiles: iterable
+        """
+        self.__tiles = list(tiles)
+        self.__index = {tile: index for index, tile in enumerate(self.__tiles)}  # Where each tile is in the list
+
+    def __len__(self):
+        return len(self.__tiles)
+
+    def __contains__(self, tile):
+        return tile in self.__index
+
+    def add(self, tile):
+        """
+        Add a tile to the pool, nothing happens if it is already in it
+        :param tile: the tiles x and y coords
+        :type tile: tuple
+        """
+        if tile not in self.__index:
+            self.__index[tile] = len(self.__tiles)
+            self.__tiles.append(tile)
+
+    def remove(self, tile):
+        """
+        Remove a tile from the pool, nothing happens if it isn't in it
+        :param tile: the tiles x and y coords
+        :type tile: tuple
+        """
+        index = self.__index.pop(tile, None)
+        if index is None:
+            return
+        last = self.__tiles.pop()
+        if index < len(self.__tiles):  # Move the last tile into the gap left by the removed one
+            self.__tiles[index] = last
+            self.__index[last] = index
+
+    def choose(self, rng=random):
+        """
+        Choose a random free tile, the tile stays in the pool until it is occupied
+        :param rng: where the random numbers come from, e.g. a random.Random with its own seed
+        :type rng: Random
+        :return: the tiles x and y coords
+        """
+        return self.__tiles[rng.randrange(len(self.__tiles))]
 
 
 class Camera:
@@ -151,6 +573,19 @@ class Camera:
         rect_position.center = (self.__x, self.__y)
         return rect_position
 
+    def visible_tiles(self, cell_width, cell_height):
+        """
+        Get the tiles that can be seen, including ones that can only partly be seen
+        :param cell_width: the width of a cell
+        :type cell_width: int
+        :param cell_height: the height of a cell
+        :type cell_height: int
+        :return: the x and y coords of the top left tile, and the x and y coords just after the bottom right tile
+        """
+        rectangle = self.rectangle
+        return (rectangle.left // cell_width, rectangle.top // cell_height,
+                (rectangle.right - 1) // cell_width + 1, (rectangle.bottom - 1) // cell_height + 1)
+
 
 class Entity:
     """Represents any entity to exist on the map, e.g. player, loot chest, etc."""
@@ -168,7 +603,12 @@ class Entity:
         self.y = y  # Map address not pixel address
         self._sprite = sprite
 
-    def draw(self, screen, cell_width, cell_height):
+    @property
+    def sprite(self):
+        """The entities current sprite"""
+        return self._sprite
+
+    def draw(self, screen, cell_width, cell_height, offset_x=0, offset_y=0):
         """
         Draws the entity to the screen
         :param screen: the screen to be drawn to
@@ -177,8 +617,13 @@ class Entity:
         :type cell_width: int
         :param cell_height: the map height
         :type cell_height: int
+        :param offset_x: how far right to draw the entity in pixels, e.g. minus the left of the cameras view
+        :type offset_x: int
+        :param offset_y: how far down to draw the entity in pixels
+        :type offset_y: int
         """
-        screen.blit(self._sprite, (self.x * cell_width, self.y * cell_height))  # Draw the sprite to the screen
+        screen.blit(self._sprite, (self.x * cell_width + offset_x, self.y * cell_height + offset_y))  # Draw the
+        # sprite to the screen
 
     def remove_sprite(self, sprites, new_map, x=-1, y=-1):
         """
@@ -186,7 +631,7 @@ class Entity:
         :param sprites: the list that the sprite is being removed from
         :type sprites: list
         :param new_map: the list of map tiles with their properties
-        :type new_map: list
+        :type new_map: Grid
         :param x: the sprites x coordinate
         :type x: int
         :param y: the sprites y coordinate
@@ -206,6 +651,8 @@ class Entity:
 class Font(Entity):
     """Represents font to be drawn"""
 
+    text_cache = TextCache()  # The rendered text shared by every font, so the same text is only rendered once
+
     def __init__(self, x, y, font, colour, text):
         """
         :param font: the font style
@@ -220,10 +667,17 @@ class Font(Entity):
         self.__colour = colour
         self.__text = text
 
-    def draw(self, screen, cell_width, cell_height):
-        """Draw the font to the screen"""
-        self._sprite = self.__font.render(self.__text, True, self.__colour)  # Set the sprite to the text
-        screen.blit(self._sprite, (self.x * cell_width, self.y * cell_height))  # Draw it to the screen
+    @property
+    def text(self):
+        """The text being drawn"""
+        return self.__text
+
+    def draw(self, screen, cell_width, cell_height, offset_x=0, offset_y=0):
+        """Draw the font to the screen, moved by the offset"""
+        if self._sprite is None:  # The text is only rendered when it has changed
+            self._sprite = self.text_cache.render(self.__font, self.__text, True, self.__colour)  # Set the sprite
+        # Draw it to the screen
+        screen.blit(self._sprite, (self.x * cell_width + offset_x, self.y * cell_height + offset_y))
 
     def set_text(self, text):
         """
@@ -231,7 +685,9 @@ class Font(Entity):
         :param text: the new text to be drawn
         :type text: str
         """
-        self.__text = text
+        if text != self.__text:
+            self.__text = text
+            self._sprite = None  # Render the new text the next time it is drawn
 
 
 class Chest(Entity):
@@ -251,7 +707,7 @@ class Chest(Entity):
         :param sprites: the list that the sprite is being removed from
         :type sprites: list
         :param new_map: the list of map tiles with their properties
-        :type new_map: list
+        :type new_map: Grid
         :param x: the sprites x coordinate
         :type x: int
         :param y: the sprites y coordinate
@@ -292,9 +748,18 @@ class Item(Entity):
         self._max_value = max_value
         self._font = Font(font_x, font_y, font, colour, name)
 
-    def generate_value(self):
-        """Generate a new value for the item"""
-        self._value = randint(self._min_value, self._max_value)
+    @property
+    def value(self):
+        """The items value, e.g. the damage a weapon does"""
+        return self._value
+
+    def generate_value(self, rng=random):
+        """
+        Generate a new value for the item
+        :param rng: where the random numbers come from
+        :type rng: Random
+        """
+        self._value = rng.randint(self._min_value, self._max_value)
 
     def set_coords(self, x, y):
         """
@@ -398,9 +863,13 @@ class LuckPotion(Item):
         """
         super().__init__(x, y, sprite, name, luck, min_luck, max_luck, font_x, font_y, font, colour)
 
-    def generate_value(self):
-        """Generates a new value for the luck potion"""
-        self._value = uniform(self._min_value, self._max_value)  # Uniform
+    def generate_value(self, rng=random):
+        """
+        Generates a new value for the luck potion
+        :param rng: where the random numbers come from
+        :type rng: Random
+        """
+        self._value = rng.uniform(self._min_value, self._max_value)  # Uniform
         # used instead of randint since it handles floats
 
     def player_interaction(self, player):
@@ -437,7 +906,7 @@ class Being(Entity):
         """
         Allows the being to change their current position
         :param new_map: the map of tiles with properties
-        :type new_map: list
+        :type new_map: Grid
         :param x_change: the amount the being is trying to change their x value by
         :type x_change: int
         :param y_change: the amount the being is trying to change their y value by
@@ -575,7 +1044,7 @@ class Player(Being):
             :param player_direction: the tile the player is facing
             :type player_direction: tuple
             :param new_map: the list of map tiles with their properties
-            :type new_map: list
+            :type new_map: Grid
             :param items: the list of items that the item is to be added to
             :type items: list
             :return: new_map, items
@@ -597,7 +1066,7 @@ class Player(Being):
             """Deletes the current inventory item and it is not dropped on the floor"""
             self.item = None
 
-        def draw(self, screen, cell_width, cell_height):
+        def draw(self, screen, cell_width, cell_height, offset_x=0, offset_y=0):
             """
             Draws the entity to the screen
             :param screen: the screen to be drawn to
@@ -606,11 +1075,16 @@ class Player(Being):
             :type cell_width: int
             :param cell_height: the map height
             :type cell_height: int
+            :param offset_x: how far to move it across in pixels, e.g. when drawing it onto the players HUD
+            :type offset_x: int
+            :param offset_y: how far to move it down in pixels
+            :type offset_y: int
             """
-            screen.blit(self._sprite, (self.x * cell_width, self.y * cell_height))  # Draw the sprite to the screen
+            # Draw the sprite to the screen
+            screen.blit(self._sprite, (self.x * cell_width + offset_x, self.y * cell_height + offset_y))
             if self.item is not None:  # Only attempt to draw the item if it exists
-                self.item.draw(screen, cell_width, cell_height)
-            self.__number.draw(screen, cell_width, cell_height)  # Draw the number font to the screen
+                self.item.draw(screen, cell_width, cell_height, offset_x, offset_y)
+            self.__number.draw(screen, cell_width, cell_height, offset_x, offset_y)  # Draw the number font
 
         def draw_item_font(self, screen, cell_width, cell_height):
             """Draws the items font to the screen"""
@@ -639,7 +1113,10 @@ class Player(Being):
                             for num in range(0, inventory_size)]
         self.__current_slot = 0
         self.__full_heart = full_heart
-        self.__hearts = [Entity(num, 2, self.__full_heart) for num in range(0, self.health)]
+        self.__heart_count = self.health  # The number of hearts on the players HUD, one for each health point
+        self.__hud = None  # The inventory slots, their items and the hearts drawn onto a surface of their own, None
+        # when something on it has changed and it has to be drawn again
+        self.__hud_position = (0, 0)  # Where the HUD surface goes on the screen
         self.luck = 0.0
         self.health_limit = health_limit
 
@@ -647,7 +1124,7 @@ class Player(Being):
         """
         Allows the being to change their current position
         :param new_map: the map of tiles with properties
-        :type new_map: list
+        :type new_map: Grid
         :param x_change: the amount the being is trying to change their x value by
         :type x_change: int
         :param y_change: the amount the being is trying to change their y value by
@@ -682,11 +1159,46 @@ class Player(Being):
         :param cell_height: the map height
         :type cell_height: int
         """
-        for slot in self.__inventory:
-            slot.draw(screen, cell_width, cell_height)
+        if self.__hud is None:  # Only draw the HUD again if something on it has changed
+            self.__draw_hud(cell_width, cell_height)
+        screen.blit(self.__hud, self.__hud_position)
+        # The current items name is away from the rest of the HUD so it is drawn on its own
         self.__inventory[self.__current_slot].draw_item_font(screen, cell_width, cell_height)
-        for heart in self.__hearts:
-            heart.draw(screen, cell_width, cell_height)
+
+    def __draw_hud(self, cell_width, cell_height):
+        """
+        Draw the inventory slots, their items and the hearts onto the players HUD surface
+        :param cell_width: the map width
+        :type cell_width: int
+        :param cell_height: the map height
+        :type cell_height: int
+        """
+        heart_width, heart_height = self.__full_heart.get_size()
+        hearts = [(num * cell_width, 2 * cell_height) for num in range(0, self.__heart_count)]  # Along the third row
+        area = [pygame.Rect(slot.x * cell_width, slot.y * cell_height, *slot.sprite.get_size())
+                for slot in self.__inventory]
+        area += [pygame.Rect(x, y, heart_width, heart_height) for x, y in hearts]
+        area = area[0].unionall(area[1:])  # The part of the screen the HUD covers
+
+        hud = pygame.Surface(area.size, pygame.SRCALPHA)  # Every pixel starts see through
+        if pygame.display.get_surface() is not None:  # Use the displays pixel format so it is quick to blit
+            hud = hud.convert_alpha()
+        for slot in self.__inventory:
+            slot.draw(hud, cell_width, cell_height, -area.left, -area.top)
+        for x, y in hearts:
+            # The hearts are drawn onto see through pixels, so they are copied exactly rather than blended
+            hud.blit(self.__full_heart, (x - area.left, y - area.top), special_flags=pygame.BLEND_RGBA_ADD)
+        self.__hud = hud
+        self.__hud_position = area.topleft
+
+    def hud_changed(self):
+        """Tell the player that something its HUD shows has changed, so the HUD is drawn again next frame"""
+        self.__hud = None
+
+    @property
+    def display_state(self):
+        """What the players HUD shows: the current inventory slot, the item in each slot and the number of hearts"""
+        return self.__current_slot, tuple(slot.item for slot in self.__inventory), self.__heart_count
 
     def update_current_slot(self, number):
         """
@@ -696,6 +1208,7 @@ class Player(Being):
         """
         self.__remove_interaction()
         self.__current_slot = number
+        self.hud_changed()
 
     def __remove_interaction(self):
         """Removes the interaction with a weapon in the players inventory"""
@@ -721,27 +1234,33 @@ class Player(Being):
         :type item: Item
         :return: True or False
         """
-        return self.__inventory[self.__current_slot].update_item(item)
+        picked_up = self.__inventory[self.__current_slot].update_item(item)
+        if picked_up:
+            self.hud_changed()
+        return picked_up
 
     def remove_item(self, new_map, items):
         """
         Attempt to remove an item from the players inventory
         :param new_map: the list of map tiles with their properties
-        :type new_map: list
+        :type new_map: Grid
         :param items: the list of items
         :type items: list
         :return: new_map, items
         """
         new_map, items = self.__inventory[self.__current_slot].remove_item(self.direction, new_map, items)
+        self.hud_changed()
         return new_map, items
 
     def delete_item(self):
         """Deletes the current item being used by the player"""
         self.__inventory[self.__current_slot].delete_item()
+        self.hud_changed()
 
     def change_heart_display(self):
         """Update the number of hearts to be displayed to the players HUD"""
-        self.__hearts = [Entity(num, 2, self.__full_heart) for num in range(0, self.health)]
+        self.__heart_count = max(self.health, 0)
+        self.hud_changed()
 
     def check_if_dead(self, sprite_dead, damage):
         """
@@ -761,7 +1280,7 @@ class Player(Being):
 class Enemy(Being):
     """Represents enemy sprites"""
 
-    def __init__(self, x, y, health, damage, sprite_f, sprite_f_attack):
+    def __init__(self, x, y, health, damage, sprite_f, sprite_f_attack, facing_right=False):
         """
         :param x: the enemies x coordinate
         :type x: int
@@ -775,64 +1294,39 @@ class Enemy(Being):
         :type sprite_f: surface
         :param sprite_f_attack: the list of sprites for the enemies default attack position
         :type sprite_f_attack: surface
+        :param facing_right: whether the enemy is facing right rather than left
+        :type facing_right: bool
         """
         super().__init__(x, y, health, damage, sprite_f, sprite_f_attack)
-        self.__path = (0, 0)
-        self.__route = []
+        self.facing_right = facing_right
         self.__clock = 0
         self.attacked_player = False
 
-    def check_distance(self, attack_distance, object_left, object_right, new_map, player_moved_again):
+    def check_distance(self, attack_distance, flow_field):
         """
         Checks if the player is within a certain distance based on the length of the path to it
         :param attack_distance: the distance that an enemy will path towards the player if they are within
         :type attack_distance: int
-        :param object_left: the tile to the left of the player
-        :type object_left: tuple
-        :param object_right: the tile to the right of the player
-        :type object_right: tuple
-        :param new_map: the list of tiles with their properties and vertices
-        :type new_map: list
-        :param player_moved_again: weather or not the player has moved
-        :type player_moved_again: bool
+        :param flow_field: the distances from each tile to the tiles either side of the player
+        :type flow_field: FlowField
         :returns: True if the player is within attack distance and False if not
         """
-        x, y = self.__path
-        if player_moved_again or new_map[x][y].occupied is True:
-            coords = (self.x, self.y)  # Enemy coordinates
-            left_distance = dist(coords, object_left)  # Distance between enemy and players left side coordinates
-            right_distance = dist(coords, object_right)  # Distance between enemy and players right side coordinates
-            x, y = object_left
-            left_tile = new_map[x][y]
-            x, y = object_right
-            right_tile = new_map[x][y]
-            if left_distance <= right_distance and left_tile.block_path is False and left_tile.occupied is False\
-                    or coords == object_left:
-                # If the left distance is less than or equal to the right distance
-                # and the tile isn't occupied or a wall tile or the enemy is already at the objects left
-                self.__path = object_left  # Path to the left side of the player
-            elif right_tile.block_path is False and right_tile.occupied is False \
-                    or coords == object_right:
-                # If the left distance is less than or equal to the right distance
-                # and the tile isn't occupied or a wall tile or the enemy is already at the objects left
-                self.__path = object_right  # Path to the right side of the player
-            elif left_tile.block_path is False and left_tile.occupied is False:
-                self.__path = object_left
-            else:
-                return False  # Return False as there is no shortest distance to the player
-            self.__route = find_shortest_path(new_map, (self.x, self.y), self.__path)  # Find a root to the player
-            # using the shortest path algorithm
-        if len(self.__route) + 1 <= attack_distance:  # If the length of the list
-            # (+1 since the path includes the tile the enemy is currently on) is less than the attack distance
+        distance = flow_field.distance(self.x, self.y)  # Number of steps to the closest side of the player
+        if distance == -1:  # If there is no path to the player
+            return False
+        if distance + 2 <= attack_distance:  # If the length of the path (the steps +1 since the path includes the
+            # tile the enemy is currently on, +1 again for the player) is less than the attack distance
             return True  # Return True as the player is within attack distance
         else:  # Else
             return False  # Return False as they are not within attack distance
 
-    def take_object_path(self, new_map, sprite_left, attack_left, sprite_right, attack_right):
+    def take_object_path(self, new_map, flow_field, sprite_left, attack_left, sprite_right, attack_right):
         """
-        Move the enemy onto the next tile in their self.path
+        Move the enemy onto the next tile of the path to the player
         :param new_map: The list of tiles with their properties
-        :type new_map: list
+        :type new_map: Grid
+        :param flow_field: the distances from each tile to the tiles either side of the player
+        :type flow_field: FlowField
         :param sprite_left: The sprite for the enemy facing left
         :type sprite_left: surface
         :param attack_left: The list of enemy attack animations for facing left
@@ -845,25 +1339,28 @@ class Enemy(Being):
         """
         left_tile = new_map[self.x-1][self.y]
         right_tile = new_map[self.x+1][self.y]
-        if len(self.__route) > 1 and self.moving is True:  # If the length the root to the player is greater than 1
-            target_tile = self.__route[1]  # The target tile is the next one in the list
-            self.__route.remove(self.__route[0])
+        target_tile = flow_field.next_step(new_map, self.x, self.y)  # The next tile on the path to the player
+        if target_tile is not None and self.moving is True:  # If the enemy isn't at the player yet
             x, y = target_tile  # Target tiles x and y values
             if target_tile == (self.x+1, self.y):  # If the target tile is on the right
                 new_map = self.move(new_map, x - self.x, y - self.y, sprite_right, attack_right)  # Move right
+                self.facing_right = True
             elif target_tile == (self.x-1, self.y):  # If the target is on the left
                 new_map = self.move(new_map, x - self.x, y - self.y, sprite_left, attack_left)  # Move left
+                self.facing_right = False
             else:  # Else
                 new_map = self.move(new_map, x - self.x, y - self.y, self._sprite, self._attack)  # Move
                 # to the target tile
         elif type(left_tile.object) == Player:  # If the enemy is at the target
             self._sprite = sprite_left
             self._attack = attack_left
+            self.facing_right = False
             self.moving = False  # They are no longer moving so they attack
             self.direction = (self.x - 1, self.y)
         elif type(right_tile.object) == Player:
             self._sprite = sprite_right
             self._attack = attack_right
+            self.facing_right = True
             self.moving = False
             self.direction = (self.x + 1, self.y)
         return new_map  # Return an updated list of tiles with properties
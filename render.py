@@ -0,0 +1,129 @@
+import pygame
+
+
+class DirtyRenderer:
+    """
+    Draws the game to the screen, but only redraws and updates the parts of the screen that have changed since the
+    last frame. It remembers which sprite it drew at each place on the screen and what the HUD showed, and when the
+    camera hasn't moved it compares them to this frame to find the places that need drawing again. If nothing has
+    changed then nothing is drawn at all, so an idle game barely uses the CPU
+    """
+
+    def __init__(self, cell_width, cell_height, background, enabled=True):
+        """
+        :param cell_width: the width of a cell
+        :type cell_width: int
+        :param cell_height: the height of a cell
+        :type cell_height: int
+        :param background: the colour behind the map
+        :type background: tuple
+        :param enabled: whether to only redraw what has changed, if False then every frame is a full redraw
+        :type enabled: bool
+        """
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.background = background
+        self.enabled = enabled
+        self.__view = None  # The cameras rectangle last frame
+        self.__terrain = None  # The terrain drawn last frame
+        self.__scene = {}  # The sprite drawn at each place on the screen last frame
+        self.__hud_state = None  # What the HUD showed last frame
+        self.__hud_rect = None  # The part of the screen the HUD covered last frame
+        self.full_redraws = 0  # The number of frames that redrew the whole screen
+        self.partial_redraws = 0  # The number of frames that only redrew some of it
+        self.skipped = 0  # The number of frames where nothing changed
+
+    def __hud_bounds(self, screen, player, level_font):
+        """
+        Find the part of the screen the HUD covers by drawing it onto a see through surface
+        :return: the HUDs rectangle
+        """
+        overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        self.__draw_hud(overlay, player, level_font)
+        return overlay.get_bounding_rect()
+
+    def __draw_hud(self, screen, player, level_font):
+        """Draw the level and the players inventory on top of everything else"""
+        level_font.draw(screen, self.cell_width, self.cell_height)  # Draw the font to the screen
+        player.draw_display(screen, self.cell_width, self.cell_height)  # Draw the players inventory to the screen
+
+    def draw(self, screen, terrain, current_map, camera, player, level_font):
+        """
+        Draw a frame and update the parts of the display that have changed
+        :param screen: the screen to be drawn to
+        :type screen: surface
+        :param terrain: the map tiles rendered once for the level
+        :type terrain: surface
+        :param current_map: the list of tiles with their properties, used to find the sprites that can be seen
+        :type current_map: Grid
+        :param camera: the players view of the map
+        :type camera: Camera
+        :param player: the player character
+        :type player: Player
+        :param level_font: the font that displays the current level
+        :type level_font: Font
+        """
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        view = camera.rectangle
+
+        # Work out which sprite is drawn where on the screen, with the player last so it is always on top
+        scene = {}
+        x1, y1, x2, y2 = camera.visible_tiles(cell_width, cell_height)
+        for sprite in current_map.objects_in(x1, y1, x2, y2):  # The exit, enemies, chests and items on those tiles
+            if sprite is not player:
+                scene[(sprite.x * cell_width - view.left, sprite.y * cell_height - view.top)] = sprite
+        scene[(player.x * cell_width - view.left, player.y * cell_height - view.top)] = player
+        surfaces = {position: sprite.sprite for position, sprite in scene.items()}  # What each one looks like
+        hud_state = (level_font.text, player.display_state)
+
+        if not self.enabled or view != self.__view or terrain is not self.__terrain:  # If the camera has moved or
+            # it is a new level
+            screen.fill(self.background)  # Fill the background
+            screen.blit(terrain, (0, 0), view)  # Draw the part of the map that can be seen
+            for position, sprite in scene.items():
+                screen.blit(surfaces[position], position)
+            self.__draw_hud(screen, player, level_font)
+            pygame.display.flip()  # Update the whole screen
+            self.full_redraws += 1
+            dirty = None
+        else:
+            # A place is dirty if the sprite drawn there last frame isn't the same one drawn there this frame
+            dirty = []
+            for position in surfaces.keys() | self.__scene.keys():
+                old_surface = self.__scene.get(position)
+                new_surface = surfaces.get(position)
+                if old_surface is not new_surface:
+                    # Cover both the old sprite and the new one, as either could be bigger in either direction
+                    rect = pygame.Rect(position, (new_surface or old_surface).get_size())
+                    if old_surface is not None and new_surface is not None:
+                        rect.union_ip(pygame.Rect(position, old_surface.get_size()))
+                    dirty.append(rect)
+            if hud_state != self.__hud_state:  # If the HUD has changed, redraw where it was and where it is now
+                dirty.append(self.__hud_rect)
+                self.__hud_rect = self.__hud_bounds(screen, player, level_font)
+                dirty.append(self.__hud_rect)
+            if len(dirty) == 0:
+                self.skipped += 1
+            else:
+                hud_rect = self.__hud_rect
+                for rect in dirty:  # Draw everything again, but only inside the dirty rectangles
+                    screen.set_clip(rect)
+                    screen.fill(self.background)
+                    screen.blit(terrain, rect.topleft, rect.move(view.left, view.top))
+                    for position, surface in surfaces.items():
+                        if rect.colliderect(pygame.Rect(position, surface.get_size())):
+                            screen.blit(surface, position)
+                    if rect.colliderect(hud_rect):  # The HUD is always drawn over the map
+                        self.__draw_hud(screen, player, level_font)
+                screen.set_clip(None)
+                pygame.display.update(dirty)  # Only send the parts that have changed to the display
+                self.partial_redraws += 1
+
+        if dirty is None:  # After a full redraw, find where the HUD is again if it has changed
+            if hud_state != self.__hud_state or self.__hud_rect is None:
+                self.__hud_rect = self.__hud_bounds(screen, player, level_font)
+        self.__view = view
+        self.__terrain = terrain
+        self.__scene = surfaces
+        self.__hud_state = hud_state
@@ -1,82 +1,674 @@
-def merge_sort(numbers):
-    """
-    recursive function that sorts numbers from lowest to highest using a merge sort
-    :param numbers: the numbers to be sorted
-    :type numbers: list
-    """
-    if len(numbers) == 1:  # If there is only one number left in this list
-        return numbers  # Return it since it cannot be halved again
-    else:  # If not
-        num_1 = numbers[0:len(numbers)//2]  # Slice one half of the list
-        num_2 = numbers[len(numbers)//2:]  # Slice the other half
-        num_1 = merge_sort(num_1)  # Sort the first half of the list recursively
-        num_2 = merge_sort(num_2)  # Sort the second half of the list recursively
-        for num in num_2:  # For each number in the second list
-            count = -1  # This is used as the index to insert a number into the first number list
-            found = False  # This is the stopping condition of the while loop and is met when the number has found
-            # its place in the first list or the number is bigger than everything in the first list
-            while not found:  # While its place hasn't been found
-                count += 1
-                if count > len(num_1) - 1:  # If the count is bigger than the length of the first list
-                    num_1.append(num)  # Insert the number at the end of that list
-                    found = True
-                elif num < num_1[count]:  # If it is smaller than the number it is being compared to
-                    num_1.insert(count, num)  # Insert it before the number it is being compared to
-                    found = True
-        return num_1
-
-
-def find_shortest_path(new_map, start_vertex, end_vertex):
+from array import array
+from collections import deque
+from heapq import heappush, heappop, nlargest, nsmallest
+from threading import local
+
+
+def merge_sort(items, key=None):
+    """
+    Sort items from lowest to highest using a bottom up merge sort, which takes O(n log n) time. Items with the same
+    key stay in the order they were given in (the sort is stable)
+    :param items: the items to be sorted
+    :type items: list
+    :param key: a function that gives the value each item is sorted by, if None then the items themselves are used
+    :type key: function
+    :return: a new sorted list
+    """
+    if key is None:
+        keys = list(items)
+    else:
+        keys = [key(item) for item in items]  # Work out each key once rather than every time it is compared
+    order = list(range(0, len(keys)))  # The items are sorted by their index, so the keys never have to be moved
+    spare = [0] * len(keys)  # The merged runs are written into this and then it is swapped with order
+    width = 1  # The length of the runs that are already sorted, every item starts as a run on its own
+    while width < len(order):
+        for start in range(0, len(order), width * 2):  # Merge each pair of runs next to each other
+            left = start
+            middle = min(start + width, len(order))
+            right = middle
+            end = min(start + width * 2, len(order))
+            for out in range(start, end):
+                # Take from the left run unless the right run has a smaller key, so equal keys keep their order
+                if left < middle and (right >= end or not keys[order[right]] < keys[order[left]]):
+                    spare[out] = order[left]
+                    left += 1
+                else:
+                    spare[out] = order[right]
+                    right += 1
+        order, spare = spare, order
+        width *= 2
+    items = list(items)
+    return [items[index] for index in order]
+
+
+def select_smallest(items, count, key=None):
+    """
+    Get the smallest few items without sorting all of them, by keeping a heap of the best ones found so far, which
+    takes O(n log k) time for k items
+    :param items: the items to choose from
+    :type items: list
+    :param count: how many items to get
+    :type count: int
+    :param key: a function that gives the value each item is compared by, if None then the items themselves are used
+    :type key: function
+    :return: a list of the smallest items from smallest to largest, items with the same key keep their order
+    """
+    return nsmallest(count, items, key=key)
+
+
+def select_largest(items, count, key=None):
+    """
+    Get the largest few items without sorting all of them
+    :param items: the items to choose from
+    :type items: list
+    :param count: how many items to get
+    :type count: int
+    :param key: a function that gives the value each item is compared by, if None then the items themselves are used
+    :type key: function
+    :return: a list of the largest items from largest to smallest, items with the same key keep their order
+    """
+    return nlargest(count, items, key=key)
+
+
+def find_shortest_path(new_map, start_vertex, end_vertex, path_finder=None, max_length=None, max_expanded=None):
     """
     Find the shortest path from one set of coordinates to another if one exists using the A* algorithm
     :param new_map: list of map tiles with their properties and vertices
-    :type new_map: list
+    :type new_map: Grid
     :param start_vertex: the start vertexes x and y coordinates
     :type start_vertex: tuple
     :param end_vertex: the end vertexes x and y coordinates
     :type end_vertex: tuple
+    :param path_finder: the path finder whose buffers are used for the search, if None then one is shared between
+    every search made by the current thread
+    :type path_finder: PathFinder
+    :param max_length: the most steps the path can take, longer paths are treated as not existing
+    :type max_length: int
+    :param max_expanded: the most vertices the search can expand before giving up
+    :type max_expanded: int
     :return path: a list of tiles that is the path from the start vertex to the end vertex
     """
-    open_vertices = []  # Initialise open list
-    closed_vertices = []  # Initialise closed list
-    path = []  # Initialise path list
-    x, y = start_vertex  # x and y values of start vertex
-    new_map[x][y].vertex.calculate_values(end_vertex)  # Calculate g, h, and f values for first vertex
-    current_vertex = start_vertex  # Set the current vertex to the first vertex
-    open_vertices.append(start_vertex)  # Add the first vertex to the open list
-    while current_vertex != end_vertex and len(open_vertices) > 0:  # While the current vertex isn't the final vertex
-        # and the open list isn't empty
-        x, y = current_vertex  # x and y values of current vertex
-        total_distance = new_map[x][y].vertex.g  # Update the total distance travelled (equal to the current vertex g)
-        for vertex, distance in new_map[x][y].vertex.adjacent_vertices.items():  # For the vertex and the distance to it
-            x, y = vertex  # Vertexes x and y values
-            if vertex not in open_vertices and vertex not in closed_vertices and new_map[x][y].block_path is False \
-                    and new_map[x][y].occupied is False:  # If the vertex isn't in the open or closed list
-                # and the tile isn't occupied or a wall tile
-                open_vertices.append(vertex)  # Add the vertex to the open list
-                new_map[x][y].vertex.calculate_values(end_vertex, total_distance, distance)  # Calculate the vertexes
-                # g, h, and f values
-                new_map[x][y].vertex.set_parent(current_vertex)  # Set its parent to the current vertex
-                # (used for re-tracing the path)
-        open_vertices.remove(current_vertex)  # Remove the current vertex from the open list
-        closed_vertices.append(current_vertex)  # And add it to the closed list
-        lowest_f = -1  # The current lowest f value in the open list
-        for vertex in open_vertices:  # For each vertex in the open list
-            x, y = vertex  # Vertexes x and y values
-            if new_map[x][y].vertex.f < lowest_f or lowest_f == -1:  # If the vertex has a lower f value than
-                # the previous vertex with the lowest f value or the lowest f value is -1
-                # meaning no lowest f value exists
-                current_vertex = vertex  # Set this vertex as the current vertex
-                lowest_f = new_map[x][y].vertex.f  # Set this vertexes f value to the lowest f value found
-
-    current_path = end_vertex  # Set the first vertex in the path to the end vertex
-    path.append(end_vertex)  # Add the last vertex to the path
-    if len(open_vertices) == 0:  # If there are no vertices in the open list (meaning a path couldn't be found)
-        return []  # Return a blank list as no path exists
-    else:  # Else
-        while current_path != start_vertex:  # While the current vertex isn't the start tile
-            x, y = current_path  # Current vertexes x and y values
-            current_path = new_map[x][y].vertex.parent  # Set the new current vertex to the vertexes parent
-            path.append(current_path)  # Add the current vertex to the path
+    if path_finder is None:
+        path_finder = get_path_finder(new_map.width, new_map.height)
+    path, _ = path_finder.a_star(new_map, start_vertex, end_vertex, max_length, max_expanded)
+    return path
+
+
+def get_path_finder(map_width, map_height):
+    """
+    Get the path finder belonging to the current thread, so that searches from different threads never share buffers
+    :param map_width: the width of the map to be searched
+    :type map_width: int
+    :param map_height: the height of the map to be searched
+    :type map_height: int
+    :return: the threads path finder, sized to the map
+    """
+    path_finder = getattr(_thread_path_finders, 'path_finder', None)
+    if path_finder is None:  # If this thread hasn't searched before
+        path_finder = PathFinder(map_width, map_height)
+        _thread_path_finders.path_finder = path_finder
+    else:
+        path_finder.resize(map_width, map_height)  # Only reallocates if the map size has changed
+    return path_finder
+
+
+class PathFinder:
+    """
+    Holds the scores and parents used by the A* algorithm in arrays sized to the map, so that searches never write
+    into the maps tiles and can be made one after another (or from different threads with their own PathFinder)
+    without the results of one search leaking into the next
+    """
+
+    def __init__(self, map_width, map_height):
+        """
+        :param map_width: the width of the maps that will be searched
+        :type map_width: int
+        :param map_height: the height of the maps that will be searched
+        :type map_height: int
+        """
+        self.map_width = 0
+        self.map_height = 0
+        self.resize(map_width, map_height)
+
+    def resize(self, map_width, map_height):
+        """
+        Resize the buffers to fit a map, nothing is reallocated if the map is the same size as before
+        :param map_width: the width of the map
+        :type map_width: int
+        :param map_height: the height of the map
+        :type map_height: int
+        """
+        if (map_width, map_height) != (self.map_width, self.map_height):
+            self.map_width = map_width
+            self.map_height = map_height
+            size = map_width * map_height  # One entry per tile, a tiles index is x * map_height + y
+            self.__g = array('l', [0]) * size  # Distance from the start to each tile
+            self.__parent = array('l', [-1]) * size  # Index of the tile each tile was reached from
+            self.__opened = array('L', [0]) * size  # The number of the last search that reached each tile
+            self.__closed = array('L', [0]) * size  # The number of the last search that expanded each tile
+            self.__search = 0  # Every search gets a new number, so the buffers never have to be cleared
+        self.expanded = 0  # How many tiles were expanded by the last search
+        self.out_of_range = False  # Whether the last search gave up because of its max length or max expanded
+
+    def a_star(self, new_map, start_vertex, end_vertex, max_length=None, max_expanded=None):
+        """
+        A* search using a binary heap for the open list, so that finding the lowest f value and checking if a vertex
+        has already been visited no longer scan through every open or closed vertex. If the maps connectivity shows
+        there is no path between the vertices then no search is done at all
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param start_vertex: the start vertexes x and y coordinates
+        :type start_vertex: tuple
+        :param end_vertex: the end vertexes x and y coordinates
+        :type end_vertex: tuple
+        :param max_length: the most steps the path can take, the search stops as soon as every path left to it
+        would be longer than this
+        :type max_length: int
+        :param max_expanded: the most vertices the search can expand before giving up
+        :type max_expanded: int
+        :return: the path from the start vertex to the end vertex (a blank list if none exists or it is out of range)
+        and the number of vertices that were expanded to find it
+        """
+        map_width = self.map_width
+        map_height = self.map_height
+        g = self.__g
+        parent = self.__parent
+        opened = self.__opened
+        closed = self.__closed
+        wall, occupied = new_map.flat_layers()  # Flat copies of the wall and occupied layers for quick lookups
+        self.__search += 1
+        search = self.__search
+        self.out_of_range = False
+        end_x, end_y = end_vertex
+        end = end_x * map_height + end_y  # Index of the end vertex
+        x, y = start_vertex
+        start = x * map_height + y  # Index of the start vertex
+        if not new_map.connectivity.connected(start_vertex, end_vertex):  # If the vertices aren't connected
+            self.expanded = 0
+            return [], 0
+        if max_length is None:
+            max_length = map_width * map_height  # No path can be longer than this
+        if max_expanded is None:
+            max_expanded = map_width * map_height
+        g[start] = 0
+        parent[start] = -1
+        opened[start] = search
+        h = abs(x - end_x) + abs(y - end_y)  # H or heuristic cost is the manhattan distance to the end vertex
+        if h > max_length:  # If the end vertex is too far away for any path to be short enough
+            self.out_of_range = True
+            self.expanded = 0
+            return [], 0
+        open_heap = [(h, h, 0, start)]  # Heap of (f, h, order, index), so the lowest f value is always at the front
+        order = 0  # Breaks ties between equal f and h values in the order vertices were added
+        expanded = 0
+        while len(open_heap) > 0:  # While the open list isn't empty
+            _, _, _, current = heappop(open_heap)  # Take the vertex with the lowest f value
+            # (and the lowest h value if f values are equal, which favours vertices closer to the end)
+            if closed[current] == search:  # If the vertex has already been expanded this is an old entry
+                continue  # left behind when a shorter route to it was found, so skip it
+            if current == end:  # If the end vertex has been reached
+                self.expanded = expanded
+                self.out_of_range = False  # Any vertices left out for being too far away didn't matter
+                return self.__trace_path(start, end), expanded
+            if expanded >= max_expanded:  # If the search has run out of vertices it is allowed to expand
+                self.out_of_range = True
+                break
+            closed[current] = search  # Add it to the closed list
+            expanded += 1
+            x, y = divmod(current, map_height)
+            new_g = g[current] + 1  # Every adjacent tile is a distance of 1 away
+            for vertex in (current - map_height if x > 0 else -1, current + map_height if x < map_width - 1 else -1,
+                           current - 1 if y > 0 else -1, current + 1 if y < map_height - 1 else -1):
+                # The index of the tile to the left, right, above, and below (-1 if it is off the map)
+                if vertex < 0 or closed[vertex] == search:  # Skip vertices off the map or in the closed list
+                    continue
+                if wall[vertex] or occupied[vertex]:  # Skip tiles that are occupied or wall tiles
+                    continue
+                adjacent_x, adjacent_y = divmod(vertex, map_height)
+                if opened[vertex] != search or new_g < g[vertex]:  # If it hasn't been reached yet
+                    # or this route to it is shorter than the previous one
+                    h = abs(adjacent_x - end_x) + abs(adjacent_y - end_y)
+                    if new_g + h > max_length:  # If every path through it would be too long (as the heuristic
+                        # never overestimates) then leave it out of the open list
+                        self.out_of_range = True
+                        continue
+                    opened[vertex] = search
+                    g[vertex] = new_g
+                    parent[vertex] = current  # Used for re-tracing the path
+                    order += 1
+                    heappush(open_heap, (new_g + h, h, order, vertex))  # Add it to the open list
+        self.expanded = expanded
+        return [], expanded  # Return a blank list as no path exists (or none is short enough)
+
+    def __trace_path(self, start, end):
+        """
+        Re-trace the path found by the last search by following each vertexes parent back to the start
+        :param start: index of the start vertex
+        :type start: int
+        :param end: index of the end vertex
+        :type end: int
+        :return path: a list of tiles that is the path from the start vertex to the end vertex
+        """
+        parent = self.__parent
+        current = end
+        path = [divmod(end, self.map_height)]  # Add the last vertex to the path
+        while current != start:  # While the current vertex isn't the start tile
+            current = parent[current]  # Set the new current vertex to the vertexes parent
+            path.append(divmod(current, self.map_height))  # Add the current vertex to the path
         return list(reversed(path))  # Return the path list in reverse
         # (as the path is found by backtracking from the end)
+
+
+class FlowField:
+    """
+    Holds the number of steps from every tile to the closest of a set of target tiles (e.g. the tiles either side of
+    the player), found with a single breadth first search from the targets. Any number of enemies can then read
+    their distance and their next step from it without searching for a path themselves
+    """
+
+    def __init__(self, map_width, map_height, max_distance=None):
+        """
+        :param map_width: the width of the map
+        :type map_width: int
+        :param map_height: the height of the map
+        :type map_height: int
+        :param max_distance: the furthest distance from a target that the search will go, tiles further away are
+        treated as having no path to a target (e.g. enemies too far away to start moving towards the player)
+        :type max_distance: int
+        """
+        self.map_width = map_width
+        self.map_height = map_height
+        if max_distance is None:
+            max_distance = map_width * map_height  # No tile can be further away than this
+        self.max_distance = max_distance
+        size = map_width * map_height  # One entry per tile, a tiles index is x * map_height + y
+        self.__distance = array('l', [0]) * size  # Steps from each tile to the closest target
+        self.__reached = array('L', [0]) * size  # The number of the last update that reached each tile
+        self.__update = 0  # Every update gets a new number, so the buffers never have to be cleared
+        self.__targets = None  # Indexes of the target tiles used by the last update or repair
+        self.__wall = None  # The maps wall and occupied layers as they were at the last update or repair
+        self.__occupied = None
+        self.__update_cost = 0  # How many tiles the last full update gave a distance to
+        self.work = 0  # How many tiles the last update or repair had to look at
+        self.repaired = False  # Whether the last call to repair managed to avoid a full update
+
+    def update(self, new_map, targets):
+        """
+        Recalculate the distance from every tile to the closest target. Occupied tiles are given a distance but the
+        search does not continue through them, so a being can read its distance from the tile it is standing on
+        while other beings, chests, etc. are still walked around
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param targets: the x and y coordinates of the target tiles
+        :type targets: tuple
+        """
+        map_width = self.map_width
+        map_height = self.map_height
+        distance = self.__distance
+        reached = self.__reached
+        self.__update += 1
+        update = self.__update
+        self.__wall, self.__occupied = new_map.flat_layers()  # Flat copies of the layers for quick lookups
+        wall = self.__wall
+        occupied = self.__occupied
+        self.__targets = self.__target_indexes(new_map, targets)
+        queue = deque()  # Tiles whose neighbours still need to be given a distance
+        for vertex in self.__targets:
+            reached[vertex] = update
+            distance[vertex] = 0
+            if not occupied[vertex]:
+                queue.append(vertex)
+        work = len(queue)
+        while len(queue) > 0:
+            current = queue.popleft()
+            x, y = divmod(current, map_height)
+            new_distance = distance[current] + 1
+            if new_distance > self.max_distance:  # If the rest of the tiles are too far away
+                break
+            for vertex in (current - map_height if x > 0 else -1, current + map_height if x < map_width - 1 else -1,
+                           current - 1 if y > 0 else -1, current + 1 if y < map_height - 1 else -1):
+                # The index of the tile to the left, right, above, and below (-1 if it is off the map)
+                if vertex < 0 or reached[vertex] == update:  # Skip tiles off the map or that already have a distance
+                    continue
+                if wall[vertex]:  # Wall tiles can't be reached
+                    continue
+                reached[vertex] = update
+                distance[vertex] = new_distance
+                work += 1
+                if not occupied[vertex]:  # Only continue the search through tiles that can be walked on
+                    queue.append(vertex)
+        self.work = work
+        self.__update_cost = work
+
+    def repair(self, new_map, targets, changed_tiles=()):
+        """
+        Bring the distances up to date after the targets have moved and/or some tiles have become occupied or free,
+        only changing the distances that depend on what changed. Distances that relied on a tile that has been
+        blocked or a target that has moved are removed and then filled back in from the tiles around them, the same
+        way D* Lite repairs its previous search. If the repair ends up looking at more tiles than a full update would
+        then the repair is abandoned and a full update is done instead
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param targets: the x and y coordinates of the new target tiles
+        :type targets: tuple
+        :param changed_tiles: the x and y coordinates of tiles that have become occupied or free since the last update
+        :type changed_tiles: list
+        """
+        if self.__targets is None:  # If there is no previous update to repair
+            self.update(new_map, targets)
+            self.repaired = False
+            return
+        map_height = self.map_height
+        distance = self.__distance
+        reached = self.__reached
+        update = self.__update
+        budget = max(self.__update_cost, 1)  # Give up once the repair costs as much as a full update
+        work = 0
+        self.__wall, self.__occupied = new_map.flat_layers()
+        wall = self.__wall
+        new_targets = self.__target_indexes(new_map, targets)
+        changed = [x * map_height + y for x, y in changed_tiles]
+        removed_targets = [vertex for vertex in self.__targets if vertex not in new_targets]
+        self.__targets = new_targets
+
+        # Remove every distance that relied on a removed target or a tile that can no longer be walked through
+        unsupported = deque()  # Tiles (with their old distance) whose neighbours might have relied on them
+        removed = []  # Tiles whose distance has been removed
+        for vertex in removed_targets:
+            if reached[vertex] == update:
+                reached[vertex] = 0  # A removed target has to get its distance from its neighbours again
+                unsupported.append((vertex, distance[vertex]))
+                removed.append(vertex)
+        for vertex in changed:
+            if reached[vertex] == update and not self.__walkable(vertex):
+                unsupported.append((vertex, distance[vertex]))
+        while len(unsupported) > 0:
+            current, old_distance = unsupported.popleft()
+            for vertex in self.__adjacent(current):
+                work += 1
+                if reached[vertex] == update and distance[vertex] == old_distance + 1 \
+                        and vertex not in new_targets and not self.__supported(vertex):
+                    # If the tile got its distance from the current one and no other tile can give it the same one
+                    reached[vertex] = 0
+                    unsupported.append((vertex, old_distance + 1))
+                    removed.append(vertex)
+            if work > budget:
+                self.update(new_map, targets)
+                self.repaired = False
+                return
+
+        # Fill distances back in, starting with the new targets and any tile that lost or could pass on a distance
+        open_heap = []
+        for vertex in new_targets:
+            reached[vertex] = update
+            distance[vertex] = 0
+            heappush(open_heap, (0, vertex))
+        for vertex in removed + changed:
+            if vertex in new_targets:
+                continue
+            if wall[vertex]:
+                continue
+            for adjacent in self.__adjacent(vertex):  # Take the best distance offered by a neighbour
+                if reached[adjacent] == update and self.__walkable(adjacent) \
+                        and distance[adjacent] < self.max_distance \
+                        and (reached[vertex] != update or distance[adjacent] + 1 < distance[vertex]):
+                    reached[vertex] = update
+                    distance[vertex] = distance[adjacent] + 1
+            if reached[vertex] == update:
+                heappush(open_heap, (distance[vertex], vertex))
+        while len(open_heap) > 0:
+            current_distance, current = heappop(open_heap)
+            work += 1
+            if work > budget:
+                self.update(new_map, targets)
+                self.repaired = False
+                return
+            if reached[current] != update or distance[current] != current_distance \
+                    or current_distance >= self.max_distance or not self.__walkable(current):
+                continue  # Skip old entries, tiles at the max distance, and tiles that can't be walked through
+            for vertex in self.__adjacent(current):
+                if not wall[vertex] \
+                        and (reached[vertex] != update or current_distance + 1 < distance[vertex]):
+                    reached[vertex] = update
+                    distance[vertex] = current_distance + 1
+                    heappush(open_heap, (current_distance + 1, vertex))
+        self.work = work
+        self.repaired = True
+
+    def __target_indexes(self, new_map, targets):
+        """
+        Get the indexes of the target tiles, ignoring any that are wall tiles
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param targets: the x and y coordinates of the target tiles
+        :type targets: tuple
+        :return: a set of indexes
+        """
+        wall = self.__wall
+        return {x * self.map_height + y for x, y in targets if not wall[x * self.map_height + y]}
+
+    def __adjacent(self, vertex):
+        """
+        Get the indexes of the tiles next to a tile
+        :param vertex: the index of the tile
+        :type vertex: int
+        :return: a list of indexes of the tiles to the left, right, above, and below that are on the map
+        """
+        map_height = self.map_height
+        x, y = divmod(vertex, map_height)
+        adjacent = []
+        if x > 0:
+            adjacent.append(vertex - map_height)
+        if x < self.map_width - 1:
+            adjacent.append(vertex + map_height)
+        if y > 0:
+            adjacent.append(vertex - 1)
+        if y < map_height - 1:
+            adjacent.append(vertex + 1)
+        return adjacent
+
+    def __walkable(self, vertex):
+        """
+        Check if the search can continue through a tile
+        :param vertex: the index of the tile
+        :type vertex: int
+        :return: True if the tile isn't a wall tile or occupied and False if not
+        """
+        return not self.__wall[vertex] and not self.__occupied[vertex]
+
+    def __supported(self, vertex):
+        """
+        Check if a tile still has a neighbour that can be walked through that is one step closer to a target
+        :param vertex: the index of the tile
+        :type vertex: int
+        :return: True if the tiles distance is still correct and False if not
+        """
+        for adjacent in self.__adjacent(vertex):
+            if self.__reached[adjacent] == self.__update and self.__distance[adjacent] == self.__distance[vertex] - 1 \
+                    and self.__walkable(adjacent):
+                return True
+        return False
+
+    def distance(self, x, y):
+        """
+        Get the number of steps from a tile to the closest target
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        :return: the number of steps, or -1 if no target can be reached from the tile
+        """
+        vertex = x * self.map_height + y
+        if self.__reached[vertex] != self.__update:
+            return -1
+        return self.__distance[vertex]
+
+    def next_step(self, new_map, x, y):
+        """
+        Get the adjacent tile that is one step closer to a target and isn't currently occupied
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param x: the current tiles x coord
+        :type x: int
+        :param y: the current tiles y coord
+        :type y: int
+        :return: the x and y coordinates of the next tile, or None if there isn't one
+        """
+        distance = self.distance(x, y)
+        if distance <= 0:  # If the tile is already a target or no target can be reached
+            return None
+        for adjacent_x, adjacent_y in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= adjacent_x < self.map_width and 0 <= adjacent_y < self.map_height \
+                    and self.distance(adjacent_x, adjacent_y) == distance - 1 \
+                    and new_map[adjacent_x][adjacent_y].occupied is False:
+                return adjacent_x, adjacent_y
+        return None  # Every tile closer to the target is occupied (e.g. by another enemy)
+
+
+class RoomGraph:
+    """
+    An abstract graph of the rooms on a map and the doorways between them, where a doorway is the pair of tiles at
+    which the tiles closest to one room meet the tiles closest to another (usually somewhere along a tunnel). Long
+    paths are planned room by room first and then only the short pieces between one doorway and the next are searched
+    tile by tile, so the cost of a search depends on how many rooms it passes through rather than how big the map is
+    """
+
+    def __init__(self, new_map, rooms):
+        """
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param rooms: the rooms on the map
+        :type rooms: list
+        """
+        self.map_width = new_map.width
+        self.map_height = new_map.height
+        map_width = self.map_width
+        map_height = self.map_height
+        wall, _ = new_map.flat_layers()
+        centres = [(room.centre_x, room.centre_y) for room in rooms]
+        region = array('l', [-1]) * (map_width * map_height)  # The number of the closest room to each tile
+        queue = deque()
+        for number, room in enumerate(rooms):  # Every room tile belongs to its own room
+            for column in room.tiles:
+                for x, y in column:
+                    region[x * map_height + y] = number
+                    queue.append((x, y))
+        while len(queue) > 0:  # Every tunnel tile belongs to the closest room to it
+            x, y = queue.popleft()
+            number = region[x * map_height + y]
+            for adjacent_x, adjacent_y in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if 0 <= adjacent_x < map_width and 0 <= adjacent_y < map_height \
+                        and not wall[adjacent_x * map_height + adjacent_y] \
+                        and region[adjacent_x * map_height + adjacent_y] == -1:
+                    region[adjacent_x * map_height + adjacent_y] = number
+                    queue.append((adjacent_x, adjacent_y))
+
+        # Find the doorways between rooms, keeping the one that gives the shortest estimated route between centres
+        self.__doorways = {}  # (room left, room entered): (tile left from, tile entered, estimated distance)
+        for x in range(0, map_width):
+            for y in range(0, map_height):
+                number = region[x * map_height + y]
+                if number == -1:
+                    continue
+                for adjacent_x, adjacent_y in ((x + 1, y), (x, y + 1)):  # Each pair of tiles is only checked once
+                    if adjacent_x >= map_width or adjacent_y >= map_height:
+                        continue
+                    other = region[adjacent_x * map_height + adjacent_y]
+                    if other == -1 or other == number:
+                        continue
+                    centre_x, centre_y = centres[number]
+                    other_x, other_y = centres[other]
+                    distance = abs(x - centre_x) + abs(y - centre_y) + 1 \
+                        + abs(adjacent_x - other_x) + abs(adjacent_y - other_y)
+                    if (number, other) not in self.__doorways or distance < self.__doorways[(number, other)][2]:
+                        self.__doorways[(number, other)] = ((x, y), (adjacent_x, adjacent_y), distance)
+                        self.__doorways[(other, number)] = ((adjacent_x, adjacent_y), (x, y), distance)
+        self.__connections = [[] for _ in rooms]  # The rooms each room has a doorway to
+        for number, other in self.__doorways:
+            self.__connections[number].append(other)
+        self.__centres = centres
+        self.__region = region
+        self.__path_finder = PathFinder(map_width, map_height)
+        self.expanded = 0  # How many tiles were expanded by the last search
+
+    def room_path(self, start_room, end_room):
+        """
+        Find the shortest route through the rooms from one room to another using the A* algorithm on the room graph
+        :param start_room: the number of the room to start from
+        :type start_room: int
+        :param end_room: the number of the room to end at
+        :type end_room: int
+        :return: a list of room numbers from the start room to the end room, or a blank list if there is no route
+        """
+        centres = self.__centres
+        end_x, end_y = centres[end_room]
+        g = {start_room: 0}  # Estimated distance from the start rooms centre to each rooms centre
+        parent = {start_room: None}
+        open_heap = [(0, start_room)]
+        closed = set()
+        while len(open_heap) > 0:
+            _, current = heappop(open_heap)
+            if current in closed:
+                continue
+            if current == end_room:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parent[current]
+                return list(reversed(path))
+            closed.add(current)
+            for room in self.__connections[current]:
+                new_g = g[current] + self.__doorways[(current, room)][2]
+                if room not in g or new_g < g[room]:
+                    g[room] = new_g
+                    parent[room] = current
+                    room_x, room_y = centres[room]
+                    heappush(open_heap, (new_g + abs(room_x - end_x) + abs(room_y - end_y), room))
+        return []
+
+    def find_path(self, new_map, start_vertex, end_vertex):
+        """
+        Find a path from one set of coordinates to another by finding the route through the rooms between them and
+        then the path from each doorway on the route to the next. The path has to go through every doorway on the
+        way, so it can be a little longer than the shortest path
+        :param new_map: list of map tiles with their properties
+        :type new_map: Grid
+        :param start_vertex: the start vertexes x and y coordinates
+        :type start_vertex: tuple
+        :param end_vertex: the end vertexes x and y coordinates
+        :type end_vertex: tuple
+        :return path: a list of tiles that is the path from the start vertex to the end vertex
+        """
+        map_height = self.map_height
+        path_finder = self.__path_finder
+        x, y = start_vertex
+        start_room = self.__region[x * map_height + y]
+        x, y = end_vertex
+        end_room = self.__region[x * map_height + y]
+        if start_room == -1 or end_room == -1:  # If either tile is a wall tile or can't be reached from any room
+            self.expanded = 0
+            return []
+        rooms = self.room_path(start_room, end_room)
+        waypoints = [start_vertex]  # The tiles the path has to go through
+        for number in range(1, len(rooms)):  # The tile entered through each doorway on the route
+            x, y = self.__doorways[(rooms[number - 1], rooms[number])][1]
+            if new_map[x][y].block_path is False and new_map[x][y].occupied is False \
+                    and (x, y) != waypoints[-1]:  # If it can be walked on
+                waypoints.append((x, y))
+        if waypoints[-1] != end_vertex:
+            waypoints.append(end_vertex)
+        path = [start_vertex]
+        expanded = 0
+        for number in range(1, len(waypoints)):  # Find the path from each waypoint to the next
+            segment, segment_expanded = path_finder.a_star(new_map, waypoints[number - 1], waypoints[number])
+            expanded += segment_expanded
+            if len(segment) == 0:  # If the way is blocked (e.g. by an enemy in a tunnel) search the whole map
+                path, segment_expanded = path_finder.a_star(new_map, start_vertex, end_vertex)
+                self.expanded = expanded + segment_expanded
+                return path
+            path.extend(segment[1:])  # The first tile of each segment is the last tile of the one before
+        self.expanded = expanded
+        return path
+
+
+_thread_path_finders = local()  # Each threads shared path finder
@@ -0,0 +1,260 @@
+import random
+import zlib
+import numpy as np
+from collections import OrderedDict
+from map import create_map
+from objs import Grid, Tile
+
+
+def carve_tunnel(new_map, x1, y1, x2, y2, vertical_first):
+    """
+    Carve a 2 wide L shaped tunnel from one tile to another
+    :param new_map: the map to carve the tunnel in
+    :type new_map: Grid
+    :param x1: the x coord the tunnel starts at
+    :type x1: int
+    :param y1: the y coord the tunnel starts at
+    :type y1: int
+    :param x2: the x coord the tunnel ends at
+    :type x2: int
+    :param y2: the y coord the tunnel ends at
+    :type y2: int
+    :param vertical_first: whether the tunnel goes up or down before it goes left or right
+    :type vertical_first: bool
+    """
+    carve = new_map.connectivity.carve
+    if vertical_first:
+        carve(x1, min(y1, y2), x1+2, max(y1, y2)+2)  # Up or down to the end y coord
+        carve(min(x1, x2), y2, max(x1, x2)+2, y2+2)  # Then across to the end x coord
+    else:
+        carve(min(x1, x2), y1, max(x1, x2)+2, y1+2)  # Across to the end x coord
+        carve(x2, min(y1, y2), x2+2, max(y1, y2)+2)  # Then up or down to the end y coord
+
+
+class ChunkedWorld:
+    """
+    An endless dungeon split into square chunks, each generated from its own seed with create_map when something
+    first looks at it. Chunks that are far from the camera are packed into a few bytes each, and once too many are
+    packed the oldest are forgotten and generated again from their seed if they are needed. Each chunk has a doorway
+    on each of its edges, at a place worked out from the seed of the edge so both chunks next to it agree on it, and
+    a tunnel from its first room to each doorway joins the chunks together.
+    Indexing it the same way as a Grid (world[x][y]) gives a Tile, so beings can move around it as they would a map
+    """
+
+    class Column:
+        """Represents one x coordinate of the world, so that world[x][y] works"""
+
+        def __init__(self, world, x):
+            """
+            :param world: the world the column belongs to
+            :type world: ChunkedWorld
+            :param x: the columns x coord
+            :type x: int
+            """
+            self.__world = world
+            self.__x = x
+
+        def __getitem__(self, y):
+            return self.__world.tile(self.__x, y)
+
+    def __init__(self, seed, chunk_size=32, room_num=4, max_room_size=8, min_room_size=4, stored_chunks=256):
+        """
+        :param seed: the seed of the whole world
+        :type seed: int
+        :param chunk_size: the width and height of each chunk in tiles
+        :type chunk_size: int
+        :param room_num: the max number of rooms in each chunk
+        :type room_num: int
+        :param max_room_size: the max width and height of each room
+        :type max_room_size: int
+        :param min_room_size: the min width and height of each room
+        :type min_room_size: int
+        :param stored_chunks: the most chunks that are kept packed after being unloaded
+        :type stored_chunks: int
+        """
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.room_num = room_num
+        self.max_room_size = max_room_size
+        self.min_room_size = min_room_size
+        self.stored_chunks = stored_chunks
+        self.__loaded = {}  # The grid of every loaded chunk by its chunk coords
+        self.__stored = OrderedDict()  # The packed tiles of unloaded chunks, oldest first
+        self.generated = 0  # The number of chunks that have been generated
+        self.unpacked = 0  # The number of chunks that have been loaded from their packed tiles
+        grid, rooms = self.__generate(0, 0)  # The chunk the player starts in
+        self.__loaded[(0, 0)] = grid
+        self.spawn_point = (rooms[0].centre_x, rooms[0].centre_y)  # Where the player starts
+
+    def __getitem__(self, x):
+        return self.Column(self, x)
+
+    def __doorway(self, kind, chunk_x, chunk_y):
+        """
+        Get the position of the doorway on an edge along a chunk
+        :param kind: 'x' for the left edge of a chunk or 'y' for its top edge
+        :type kind: str
+        :param chunk_x: the chunks x coord
+        :type chunk_x: int
+        :param chunk_y: the chunks y coord
+        :type chunk_y: int
+        :return: how far along the edge the doorway is
+        """
+        return random.Random(f"{self.seed}:{kind}:{chunk_x}:{chunk_y}").randint(2, self.chunk_size - 4)
+
+    def __generate(self, chunk_x, chunk_y):
+        """
+        Generate a chunk
+        :param chunk_x: the chunks x coord
+        :type chunk_x: int
+        :param chunk_y: the chunks y coord
+        :type chunk_y: int
+        :return: the chunks grid and rooms
+        """
+        size = self.chunk_size
+        rng = random.Random(f"{self.seed}:{chunk_x}:{chunk_y}")
+        new_map, rooms = create_map(self.room_num, size, size, self.min_room_size, self.max_room_size,
+                                    self.min_room_size, self.max_room_size, rng=rng)
+        room_x, room_y = rooms[0].centre_x, rooms[0].centre_y
+        left = self.__doorway('x', chunk_x, chunk_y)
+        right = self.__doorway('x', chunk_x + 1, chunk_y)
+        top = self.__doorway('y', chunk_x, chunk_y)
+        bottom = self.__doorway('y', chunk_x, chunk_y + 1)
+        carve_tunnel(new_map, room_x, room_y, 0, left, True)  # Tunnel to each doorway
+        carve_tunnel(new_map, room_x, room_y, size - 2, right, True)
+        carve_tunnel(new_map, room_x, room_y, top, 0, False)
+        carve_tunnel(new_map, room_x, room_y, bottom, size - 2, False)
+
+        # Find the visible tiles again now that the edges can be walked through, the tiles next to the chunk are walls
+        # apart from the doorways of the chunks next to it
+        path = np.zeros((size + 2, size + 2), dtype=bool)
+        path[1:-1, 1:-1] = ~new_map.wall
+        path[0, left+1:left+3] = True
+        path[-1, right+1:right+3] = True
+        path[top+1:top+3, 0] = True
+        path[bottom+1:bottom+3, -1] = True
+        near_x = path[:-2] | path[1:-1] | path[2:]
+        new_map.visible[:] = near_x[:, :-2] | near_x[:, 1:-1] | near_x[:, 2:]
+        self.generated += 1
+        return new_map, rooms
+
+    def chunk(self, chunk_x, chunk_y):
+        """
+        Get a chunk, loading it if it isn't already loaded
+        :param chunk_x: the chunks x coord
+        :type chunk_x: int
+        :param chunk_y: the chunks y coord
+        :type chunk_y: int
+        :return: the chunks grid
+        """
+        key = (chunk_x, chunk_y)
+        grid = self.__loaded.get(key)
+        if grid is None:
+            packed = self.__stored.pop(key, None)
+            if packed is None:  # If it has never been generated or has been forgotten
+                grid, _ = self.__generate(chunk_x, chunk_y)
+            else:
+                grid = Grid(self.chunk_size, self.chunk_size)
+                tiles = np.frombuffer(zlib.decompress(packed), dtype=np.uint8).reshape(self.chunk_size,
+                                                                                      self.chunk_size)
+                grid.wall[:] = tiles & 1 != 0
+                grid.floor[:] = tiles & 2 != 0
+                grid.visible[:] = tiles & 4 != 0
+                grid.connectivity.changed()
+                self.unpacked += 1
+            self.__loaded[key] = grid
+        return grid
+
+    def tile(self, x, y):
+        """
+        Get a tile of the world
+        :param x: the tiles x coord
+        :type x: int
+        :param y: the tiles y coord
+        :type y: int
+        :return: the tile
+        """
+        chunk_x, tile_x = divmod(x, self.chunk_size)
+        chunk_y, tile_y = divmod(y, self.chunk_size)
+        return Tile(self.chunk(chunk_x, chunk_y), tile_x, tile_y)
+
+    def update(self, view, cell_width, cell_height, margin=1):
+        """
+        Load the chunks that can be seen and unload the ones that are far enough away
+        :param view: the part of the world that can be seen in pixels, e.g. the cameras rectangle
+        :type view: Rect
+        :param cell_width: the width of a cell
+        :type cell_width: int
+        :param cell_height: the height of a cell
+        :type cell_height: int
+        :param margin: how many chunks around the view are kept loaded
+        :type margin: int
+        """
+        size = self.chunk_size
+        first_x = view.left // cell_width // size - margin
+        last_x = (view.right - 1) // cell_width // size + margin
+        first_y = view.top // cell_height // size - margin
+        last_y = (view.bottom - 1) // cell_height // size + margin
+        for chunk_x in range(first_x, last_x + 1):
+            for chunk_y in range(first_y, last_y + 1):
+                self.chunk(chunk_x, chunk_y)
+        for key in list(self.__loaded.keys()):
+            chunk_x, chunk_y = key
+            if not (first_x <= chunk_x <= last_x and first_y <= chunk_y <= last_y):  # If it is out of range
+                grid = self.__loaded.pop(key)
+                if grid.occupied.any():  # Something is still standing in it, so keep it loaded
+                    self.__loaded[key] = grid
+                    continue
+                tiles = grid.wall.astype(np.uint8) | grid.floor.astype(np.uint8) << 1 | \
+                    grid.visible.astype(np.uint8) << 2
+                self.__stored[key] = zlib.compress(tiles.tobytes())
+                if len(self.__stored) > self.stored_chunks:  # Forget the chunk that was unloaded the longest ago
+                    self.__stored.popitem(last=False)
+
+    @property
+    def loaded_chunks(self):
+        """The number of chunks that are loaded"""
+        return len(self.__loaded)
+
+    @property
+    def stored_bytes(self):
+        """The number of bytes used by the packed chunks"""
+        return sum(len(packed) for packed in self.__stored.values())
+
+    def draw(self, screen, view, cell_width, cell_height, wall, floor):
+        """
+        Draw the visible tiles of the loaded chunks that can be seen
+        :param screen: the screen to be drawn to
+        :type screen: surface
+        :param view: the part of the world that can be seen in pixels, e.g. the cameras rectangle
+        :type view: Rect
+        :param cell_width: the width of a cell
+        :type cell_width: int
+        :param cell_height: the height of a cell
+        :type cell_height: int
+        :param wall: the sprite for a wall tile
+        :type wall: surface
+        :param floor: the sprite for a floor tile
+        :type floor: surface
+        """
+        size = self.chunk_size
+        first_x = view.left // cell_width  # The tiles at the edges of the view
+        last_x = (view.right - 1) // cell_width
+        first_y = view.top // cell_height
+        last_y = (view.bottom - 1) // cell_height
+        for (chunk_x, chunk_y), grid in self.__loaded.items():
+            left = max(first_x - chunk_x * size, 0)  # The part of the chunk that can be seen
+            right = min(last_x - chunk_x * size + 1, size)
+            top = max(first_y - chunk_y * size, 0)
+            bottom = min(last_y - chunk_y * size + 1, size)
+            if left >= right or top >= bottom:  # If none of the chunk can be seen
+                continue
+            visible = grid.visible[left:right, top:bottom]
+            walls = visible & grid.wall[left:right, top:bottom]
+            floors = visible & ~grid.wall[left:right, top:bottom]
+            offset_x = (chunk_x * size + left) * cell_width - view.left  # Where the part is on the screen
+            offset_y = (chunk_y * size + top) * cell_height - view.top
+            for x, y in zip(*walls.nonzero()):
+                screen.blit(wall, (offset_x + x * cell_width, offset_y + y * cell_height))
+            for x, y in zip(*floors.nonzero()):
+                screen.blit(floor, (offset_x + x * cell_width, offset_y + y * cell_height))